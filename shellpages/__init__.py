@@ -0,0 +1,4 @@
+"""An API for building shell-based programs."""
+from __future__ import absolute_import
+
+from .shellpages import *
@@ -0,0 +1,103 @@
+"""Benchmarks for the render and process loops of shellpages.
+
+Run this file with each interpreter you want to compare, e.g.
+
+    python2.7 bench_shellpages.py
+    python3.11 bench_shellpages.py
+
+Every benchmark prints the best time per loop of several repeats.
+The startup benchmarks run a new interpreter every loop, so compare
+first_frame against startup to see what importing shellpages and
+showing a page costs.
+"""
+from __future__ import print_function
+
+from timeit import repeat
+import subprocess
+import platform
+import sys
+import os
+
+from shellpages import *
+
+def _page(count=20):
+    keys = [chr(ord('!') + i) for i in range(count)]
+    return Page(
+        title='Benchmark', body='A body line\nand another line',
+        options=dict((key, Option(key, 'Option ' + key, lambda: None))
+                     for key in keys),
+        order=keys)
+
+def bench_render():
+    page = _page()
+    page.add_message('A message')
+    return lambda: page.__str__()
+
+def bench_process():
+    page = _page()
+    return lambda: (page.process('!'), page.process('invalid'))
+
+def bench_parse_error():
+    def parse(self, data):
+        raise ParseError('"{}" is not a valid input'.format(data))
+    page = _page()
+    page.parse = parse
+    return lambda: page.process('invalid')
+
+def _options(count=10000):
+    # Option keys are single characters, and only Python 3 formats
+    # more than the printable ASCII ones without unicode errors
+    if sys.version_info[0] < 3:
+        count = min(count, 94)
+    keys = [chr(0x21 + i) if i < 94 else chr(0x4e00 + i)
+            for i in range(count)]
+    return [Option(key, 'Option', lambda: None) for key in keys]
+
+def bench_build_one_by_one():
+    options = _options()
+    mapping = dict((option.key, option) for option in options)
+    order = [option.key for option in options]
+    return lambda: Page(options=mapping, order=order)
+
+def bench_build_from_options():
+    options = _options()
+    return lambda: Page.from_options(options)
+
+bench_build_one_by_one.number = bench_build_from_options.number = 10
+
+_FIRST_FRAME = """
+import shellpages
+print(shellpages.Page(
+    title='Benchmark', body='A body line',
+    options={'q': shellpages.Option('q', 'Quit', lambda: None)},
+    order=['q']))
+"""
+
+def _interpreter(source):
+    command = [sys.executable, '-c', source]
+    here = os.path.dirname(os.path.abspath(__file__))
+    return lambda: subprocess.check_output(command, cwd=here)
+
+def bench_startup():
+    return _interpreter('pass')
+
+def bench_first_frame():
+    return _interpreter(_FIRST_FRAME)
+
+bench_startup.number = bench_first_frame.number = 10
+
+BENCHMARKS = [bench_render, bench_process, bench_parse_error,
+              bench_build_one_by_one, bench_build_from_options,
+              bench_startup, bench_first_frame]
+
+def run(benchmarks=BENCHMARKS, number=1000, repeats=5):
+    print('{} {}'.format(
+        platform.python_implementation(), platform.python_version()))
+    for benchmark in benchmarks:
+        loops = getattr(benchmark, 'number', number)
+        best = min(repeat(benchmark(), number=loops, repeat=repeats))
+        print('{:<24}{:>10.2f} us'.format(
+            benchmark.__name__[len('bench_'):], best / loops * 1e6))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,244 @@
+"""Profile a shellpages application without instrumenting it.
+
+Usage:
+    python -m shellpages.profile [options] module:attribute
+
+The attribute names a Browser, or a function that returns one. The
+browser is driven headless with one line of input per line of the
+input file, so nothing is displayed and the screen is never cleared.
+Options that read input themselves read the following lines.
+
+The hottest functions are reported for every page name and option
+key the time was spent in. Each page has a 'render' group for
+laying it out and a 'process' group for Page.process and its parse
+method, and each option key has a group for calling the option.
+"""
+from __future__ import absolute_import, print_function
+
+from timeit import default_timer
+import argparse
+import cProfile
+import importlib
+import pstats
+import signal
+import sys
+import os
+
+from .shellpages import Browser
+
+class Profiler(object):
+    """Profile a Browser, grouping time by page name and option key.
+
+    Profilers use cProfile by default. Sampling profilers instead look
+    at what's running every interval seconds of CPU time, which costs
+    far less but needs a platform with SIGPROF.
+    """
+    def __init__(self, sampling=False, interval=0.001):
+        """Create a profiler object.
+
+        Keyword Arguments:
+            sampling -- sample the stack instead of using cProfile
+                (default False)
+            interval -- CPU seconds between samples (default 0.001)
+
+        Raises:
+            RuntimeError if sampling on a platform without SIGPROF
+        """
+        if sampling and not hasattr(signal, 'SIGPROF'):
+            raise RuntimeError('sampling needs a platform with SIGPROF')
+        self._sampling = sampling
+        self._interval = interval
+        self._group = None
+        self._profiles = {}
+        self._times = {}
+        self._calls = {}
+
+    #-----Public methods-----
+
+    def drive(self, browser, lines):
+        """Run a Browser headless on lines of input.
+
+        Driving stops when the input runs out, the input is 'quit' or
+        an option exits.
+
+        Arguments:
+            browser -- Browser to drive
+            lines ---- file of lines of input
+        """
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        if self._sampling:
+            handler = signal.signal(signal.SIGPROF, self._sample)
+            signal.setitimer(
+                signal.ITIMER_PROF, self._interval, self._interval)
+        try:
+            self._drive(browser, lines)
+        except SystemExit:
+            pass
+        finally:
+            if self._sampling:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+                signal.signal(signal.SIGPROF, handler)
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    def report(self, limit=10, stream=None):
+        """Write the hottest functions of each group, slowest first.
+
+        Keyword Arguments:
+            limit --- functions reported for each group (default 10)
+            stream -- file to write to (default sys.stdout)
+        """
+        stream = stream or sys.stdout
+        for group in sorted(self._times, key=lambda g: -self._times[g]):
+            stream.write('page {!r}, {}: {:.3f} ms over {} calls\n'.format(
+                group[0], _describe(group[1]), self._times[group] * 1000,
+                self._calls[group]))
+            for line in self._hottest(group, limit):
+                stream.write('    ' + line + '\n')
+            stream.write('\n')
+
+    #-----Private methods-----
+
+    def _drive(self, browser, lines):
+        # Read line by line, so options reading the same file themselves
+        # get the lines that follow
+        while True:
+            data = lines.readline()
+            if not data:
+                return
+            data = data.rstrip('\r\n')
+            if not browser.history or data == 'quit':
+                return
+            name = browser.history[-1]
+            page = browser.pages[name]
+            self._run(name, 'render', self._render, page)
+            key, args, kwargs = self._run(name, 'process', page.process, data)
+            if key != 'invalid input':
+                option = page.options[key]
+                self._run(name, key, option, *args, **kwargs)
+            elif data.startswith('goto '):
+                page.remove_messages()
+                self._run(name, 'goto', self._goto, browser, data)
+
+    def _render(self, page):
+        if hasattr(page, 'refresh'):
+            page.refresh()
+        return page.__str__()
+
+    def _goto(self, browser, data):
+        try:
+            browser.goto(data[len('goto '):].strip())
+        except ValueError:
+            pass
+
+    def _run(self, name, key, function, *args, **kwargs):
+        group = name, key
+        profile = None
+        if not self._sampling:
+            profile = self._profiles.get(group)
+            if profile is None:
+                profile = self._profiles[group] = cProfile.Profile()
+        self._group = group
+        start = default_timer()
+        try:
+            if profile is None:
+                return function(*args, **kwargs)
+            return profile.runcall(function, *args, **kwargs)
+        finally:
+            self._times[group] = (self._times.get(group, 0) +
+                                  default_timer() - start)
+            self._calls[group] = self._calls.get(group, 0) + 1
+            self._group = None
+
+    def _sample(self, signum, frame):
+        if self._group is None or frame is None:
+            return
+        counts = self._profiles.setdefault(self._group, {})
+        code = frame.f_code
+        where = code.co_filename, code.co_firstlineno, code.co_name
+        counts[where] = counts.get(where, 0) + 1
+
+    def _hottest(self, group, limit):
+        profile = self._profiles.get(group)
+        if not profile:
+            return []
+        if self._sampling:
+            total = float(sum(profile.values()))
+            ranked = sorted(profile.items(), key=lambda item: -item[1])
+            return ['{:5.1f}% {:6d} samples  {}'.format(
+                    count / total * 100, count, _where(where))
+                    for where, count in ranked[:limit]]
+        stats = pstats.Stats(profile).stats
+        ranked = sorted((item for item in stats.items()
+                         if '_lsprof.Profiler' not in item[0][2]),
+                        key=lambda item: -item[1][2])
+        return ['{:9.3f} ms {:6d} calls  {}'.format(
+                    tottime * 1000, calls, _where(where))
+                for where, (primitive, calls, tottime, cumtime, callers)
+                in ranked[:limit]]
+
+def _describe(key):
+    if key in ('render', 'process', 'goto'):
+        return key
+    return 'option {!r}'.format(key)
+
+def _where(where):
+    filename, line, function = where
+    if filename == '~':
+        return function
+    return '{} ({}:{})'.format(function, os.path.basename(filename), line)
+
+def load(spec):
+    """Load the Browser named by a 'module:attribute' string.
+
+    The attribute defaults to 'browser', and if it's a function it's
+    called to build the Browser.
+
+    Raises:
+        TypeError if the attribute isn't a Browser or doesn't return one
+    """
+    module, _, attribute = spec.partition(':')
+    browser = getattr(importlib.import_module(module), attribute or 'browser')
+    if not isinstance(browser, Browser) and callable(browser):
+        browser = browser()
+    if not isinstance(browser, Browser):
+        raise TypeError(spec + ' is not a Browser')
+    return browser
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m shellpages.profile',
+        description='Profile a shellpages application headless.')
+    parser.add_argument(
+        'app', help="'module:attribute' naming a Browser or a function "
+                    "that returns one")
+    parser.add_argument(
+        '-i', '--input', help='file with a line of input per line '
+                              '(default stdin)')
+    parser.add_argument(
+        '-s', '--sampling', action='store_true',
+        help='sample the stack instead of using cProfile')
+    parser.add_argument(
+        '--interval', type=float, default=0.001,
+        help='CPU seconds between samples (default 0.001)')
+    parser.add_argument(
+        '-n', '--limit', type=int, default=10,
+        help='functions reported for each group (default 10)')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.getcwd())
+    browser = load(args.app)
+    profiler = Profiler(args.sampling, args.interval)
+    stdin = sys.stdin
+    if args.input:
+        sys.stdin = open(args.input)
+    try:
+        profiler.drive(browser, sys.stdin)
+    finally:
+        if sys.stdin is not stdin:
+            sys.stdin.close()
+            sys.stdin = stdin
+    profiler.report(args.limit)
+
+if __name__ == '__main__':
+    main()
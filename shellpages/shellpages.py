@@ -1,23 +1,565 @@
-from copy import deepcopy
-from collections import Sequence
-from types import MethodType
+from __future__ import print_function
 
-import subprocess
+# Only modules that are built in or loaded when python starts are
+# imported here. The rest are imported by the functions that need
+# them, so a program that shows one page and exits doesn't pay for
+# serving, wrapping or clearing the screen with another process.
+import time
 import sys
-import re
-
-def _get_clear_word():
+import gc
+import os
+
+try:
+    basestring
+except NameError:
+    # Python 3
+    basestring = str
+    raw_input = input
+
+try:
+    from _thread import allocate_lock
+except ImportError:
+    # Python 2
+    from thread import allocate_lock
+
+# Messages that mean a parse method didn't return three values
+_UNPACK_ERRORS = '|'.join((
+    r"'[\w\.]*\w+' object is not iterable",
+    r'cannot unpack non-iterable',
+    r'need more than [12] values* to unpack',
+    r'not enough values to unpack',
+    r'too many values to unpack'))
+
+# Messages that mean something other than a page is in a browser
+_NOT_A_PAGE_ERRORS = '|'.join((
+    r".+has no attribute 'process'",
+    r".+has no attribute 'options'",
+    r".+is not callable"))
+
+def _clear():
+    # Clear the screen with an escape sequence instead of starting a
+    # new process, except on Windows consoles that don't support it
     if sys.platform == 'win32':
-        return 'cls'
+        import subprocess
+        subprocess.call('cls', shell=True)
+    else:
+        sys.stdout.write('\x1b[2J\x1b[H')
+        sys.stdout.flush()
+
+def _is_default_str(text):
+    # Whether text looks like object.__str__'s '<... object at 0x...>',
+    # the same as re.match(r'^<.+>$', text) without importing re
+    if text.endswith('\n'):
+        text = text[:-1]
+    return (len(text) > 2 and text[0] == '<' and text[-1] == '>' and
+            '\n' not in text)
+
+INFO, WARNING, ERROR = 0, 1, 2
+
+def _terminal_width():
+    # Ask the terminal for its size, falling back to $COLUMNS and then
+    # to the classic 80 columns when stdout isn't a terminal.
+    columns = 0
+    try:
+        import fcntl, termios, struct
+        size = fcntl.ioctl(
+            sys.stdout.fileno(), termios.TIOCGWINSZ, struct.pack('hh', 0, 0))
+        columns = struct.unpack('hh', size)[1]
+    except Exception:
+        pass
+    if not columns:
+        try:
+            columns = int(os.environ.get('COLUMNS', 80))
+        except ValueError:
+            columns = 80
+    # Leave the last column empty so lines never auto-wrap
+    return max(columns - 1, Layout.MIN_WIDTH)
+
+def _getch():
+    # Read a single keypress without waiting for Enter
+    try:
+        import msvcrt
+    except ImportError:
+        pass
     else:
-        return 'clear'
+        return getattr(msvcrt, 'getwch', msvcrt.getch)()
+    import termios, tty
+    fd = sys.stdin.fileno()
+    old = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)
+        key = os.read(fd, 1)
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old)
+    if not isinstance(key, str):
+        key = key.decode('utf-8', 'replace')
+    return key
+
+def _check_option(key, option):
+    try:
+        assert isinstance(key, basestring), TypeError(
+            'key must be a string')
+        assert len(key) == 1, ValueError('key must be 1 character')
+        assert callable(option), TypeError(
+            'option must be callable')
+        assert not _is_default_str(option.__str__()), TypeError(
+            'option must have a valid string method wrapper')
+    except AssertionError as e:
+        raise e.args[0]
 
-_CLEAR = _get_clear_word()
+def _default_parse(self, data):
+    return 'input not checked', (), {}
 
 class ParseError(Exception):
     def __init__(self, message='Invalid input.'):
         Exception.__init__(self, message)
 
+def _tracemalloc():
+    try:
+        import tracemalloc
+    except ImportError:
+        raise RuntimeError('memory snapshots need python 3.4 or later')
+    return tracemalloc
+
+def _rss(pid):
+    # Shared and private resident memory of a process in kB
+    path = '/proc/{}/smaps_rollup'.format(pid)
+    if not os.path.exists(path):
+        path = '/proc/{}/smaps'.format(pid)
+    shared = private = 0
+    with open(path) as smaps:
+        for line in smaps:
+            if line.startswith('Shared_'):
+                shared += int(line.split()[1])
+            elif line.startswith('Private_'):
+                private += int(line.split()[1])
+    return shared, private
+
+def _sizeof(obj, seen):
+    # Approximate size of an object and everything it holds that isn't
+    # in seen. Functions are followed into their closures and defaults,
+    # but never into their globals. Objects are walked with a stack
+    # rather than recursion, so deep chains of objects can be sized.
+    from types import FunctionType, MethodType, ModuleType
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if (obj is None or id(obj) in seen or
+                isinstance(obj, (type, ModuleType))):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            for key, value in obj.items():
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, FunctionType):
+            for cell in obj.__closure__ or ():
+                try:
+                    stack.append(cell.cell_contents)
+                except ValueError:
+                    pass
+            stack.append(obj.__defaults__)
+        elif isinstance(obj, MethodType):
+            stack.append(obj.__self__)
+            stack.append(obj.__func__)
+        else:
+            if hasattr(obj, '__dict__'):
+                stack.append(vars(obj))
+            for slot in getattr(type(obj), '__slots__', ()):
+                stack.append(getattr(obj, slot, None))
+    return size
+
+class Layout(object):
+    """Fit page text to the width of the terminal.
+
+    A layout wraps lines that are too long for its width and truncates
+    titles that don't fit on one line. Laid out text is cached for each
+    (text, width) pair, so text is laid out again only when the
+    terminal is resized or the text hasn't been used in a while.
+
+    The cache holds two generations of at most CACHE_SIZE entries. When
+    the newer one fills up it replaces the older one, and text found in
+    the older one is moved back to the newer one, so text that keeps
+    changing, like a live body or messages, can't grow it forever.
+
+    Layouts hold no per-page state and can be shared between pages.
+    """
+    MIN_WIDTH = 10
+    CACHE_SIZE = 256
+
+    def __init__(self, width=None):
+        """Create a layout object.
+
+        Keyword Arguments:
+            width -- fixed number of characters per line, or None to
+                use the width of the terminal (default None)
+
+        Raises:
+            TypeError if width is not an integer or None
+            ValueError if width is less than 10
+        """
+        if width is not None:
+            if not isinstance(width, int):
+                raise TypeError('width must be an integer')
+            elif width < Layout.MIN_WIDTH:
+                raise ValueError('width must be at least 10 characters')
+        self._fixed = width
+        self._width = width
+        self._cache = {}
+        self._old = {}
+
+    #-----Public methods-----
+
+    def wrap(self, text, width=None, indent=0):
+        """Wrap each line of text that is wider than the layout.
+
+        Lines that fit are left untouched, and wrapped lines are
+        continued with 'indent' spaces.
+
+        Arguments:
+            text -- text to lay out
+
+        Keyword Arguments:
+            width --- characters per line (default the layout's width)
+            indent -- hanging indent of continued lines (default 0)
+
+        Returns:
+            a tuple of the laid out lines
+        """
+        if width is None:
+            width = self.width
+        cache_key = (text, width, indent)
+        try:
+            return self._cache[cache_key]
+        except KeyError:
+            pass
+        lines = self._old.pop(cache_key, None)
+        if lines is None:
+            lines = []
+            for line in text.split('\n'):
+                if len(line) <= width:
+                    lines.append(line)
+                else:
+                    import textwrap
+                    lines.extend(textwrap.wrap(
+                        line, width, subsequent_indent=' ' * indent,
+                        break_on_hyphens=False) or [''])
+            lines = tuple(lines)
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._old = self._cache
+            self._cache = {}
+        self._cache[cache_key] = lines
+        return lines
+
+    def fill(self, text, width=None, indent=0):
+        """Wrap text like the wrap method, but return a single string."""
+        return '\n'.join(self.wrap(text, width, indent))
+
+    def grid(self, cells, width=None, gap=2):
+        """Arrange cells in as many columns as fit the layout's width.
+
+        Cells run down each column before the next, like 'ls', and
+        cells wider than the layout are truncated.
+
+        Arguments:
+            cells -- list of single line strings
+
+        Keyword Arguments:
+            width -- characters per line (default the layout's width)
+            gap ---- spaces between columns (default 2)
+        """
+        if width is None:
+            width = self.width
+        if not cells:
+            return ''
+        cell_width = min(max(len(cell) for cell in cells), width)
+        columns = max((width + gap) // (cell_width + gap), 1)
+        rows = -(-len(cells) // columns)
+        lines = []
+        for row in range(rows):
+            line = [self.truncate(cell, cell_width).ljust(cell_width)
+                    for cell in cells[row::rows]]
+            lines.append((' ' * gap).join(line).rstrip())
+        return '\n'.join(lines)
+
+    def table(self, rows, width=None, gap=2):
+        """Align tab separated fields of each row into columns.
+
+        Rows wider than the layout are truncated.
+
+        Arguments:
+            rows -- list of single line strings with fields separated
+                by tabs
+
+        Keyword Arguments:
+            width -- characters per line (default the layout's width)
+            gap ---- spaces between columns (default 2)
+        """
+        if width is None:
+            width = self.width
+        rows = [row.split('\t') for row in rows]
+        widths = []
+        for row in rows:
+            for i, cell in enumerate(row):
+                if i == len(widths):
+                    widths.append(len(cell))
+                elif len(cell) > widths[i]:
+                    widths[i] = len(cell)
+        lines = []
+        for row in rows:
+            line = (' ' * gap).join(
+                cell.ljust(widths[i]) for i, cell in enumerate(row))
+            lines.append(self.truncate(line.rstrip(), width))
+        return '\n'.join(lines)
+
+    def truncate(self, text, width=None):
+        """Cut a single line of text down to the layout's width.
+
+        Truncated text ends in '...'.
+
+        Arguments:
+            text -- line to truncate
+
+        Keyword Arguments:
+            width -- characters allowed (default the layout's width)
+        """
+        if width is None:
+            width = self.width
+        if len(text) <= width:
+            return text
+        return text[:max(width - 3, 0)] + '...'
+
+    #-----Public properties-----
+
+    @property
+    def width(self):
+        """Number of characters that fit on one line.
+
+        Reading the width checks the terminal's size, and drops every
+        cached layout if it has changed.
+        """
+        width = self._fixed or _terminal_width()
+        if width != self._width:
+            self._cache = {}
+            self._old = {}
+            self._width = width
+        return width
+
+    #-----Method Wrappers-----
+
+    def __deepcopy__(self, memo):
+        # Layouts are shared between pages, so copies share them too
+        return self
+
+_FIXED_LAYOUT = Layout(79)
+
+class Frame(object):
+    """A page laid out for display, as structured data.
+
+    Front ends other than a terminal can read a frame's parts directly
+    instead of parsing the page's text. Printing a frame gives the
+    same text as printing its page, and that text is only built the
+    first time it's needed.
+
+    All properties of a frame are immutable.
+    """
+    __slots__ = ('_title', '_body', '_options', '_rows', '_messages',
+                 '_text')
+
+    def __init__(self, title, body, options, rows, messages):
+        """Create a frame object.
+
+        Arguments:
+            title ----- title truncated to fit, or '' for no title
+            body ------ tuple of the lines of the body
+            options --- tuple of (key, text) pairs in display order
+            rows ------ tuple of the lines the options are laid out on
+            messages -- tuple of messages, each a tuple of lines
+        """
+        self._title = title
+        self._body = body
+        self._options = options
+        self._rows = rows
+        self._messages = messages
+        self._text = None
+
+    #-----Public properties-----
+
+    @property
+    def title(self):
+        """The page's title, truncated to fit, or ''."""
+        return self._title
+
+    @property
+    def body(self):
+        """A tuple of the lines of the page's body."""
+        return self._body
+
+    @property
+    def options(self):
+        """A tuple of (key, text) pairs of options in display order."""
+        return self._options
+
+    @property
+    def rows(self):
+        """A tuple of the lines the options are laid out on."""
+        return self._rows
+
+    @property
+    def messages(self):
+        """A tuple of the page's messages, each a tuple of lines."""
+        return self._messages
+
+    #-----Method Wrappers-----
+
+    def __str__(self):
+        if self._text is None:
+            parts = []
+            if self._title:
+                parts.append('[{}]\n\n'.format(self._title))
+            if self._body:
+                parts.extend(line + '\n' for line in self._body)
+                parts.append('\n')
+            parts.extend(row + '\n' for row in self._rows)
+            for message in self._messages:
+                parts.append('\n')
+                parts.extend(line + '\n' for line in message)
+            self._text = ''.join(parts)
+        return self._text
+
+class MessageRing(object):
+    """A bounded collection of messages to display to the user.
+
+    A message ring holds a fixed number of messages, so displaying
+    them costs the same no matter how many are added. When the ring is
+    full the oldest message with the lowest severity makes room, and
+    messages less severe than all of those held are dropped. A message
+    that's added again while it's held is counted instead of repeated,
+    and is displayed as 'message (x12)'. New messages can also be
+    limited to a number per period of time.
+
+    Iterating over a ring gives each message as it's displayed, and a
+    ring compares equal to a list of those strings.
+    """
+    def __init__(self, capacity=10, rate=None, period=1.0):
+        """Create a message ring object.
+
+        Keyword Arguments:
+            capacity -- most messages held at once (default 10)
+            rate ------ most new messages accepted per period, or None
+                for no limit (default None)
+            period ---- seconds the rate applies to (default 1.0)
+
+        Raises:
+            TypeError if capacity or rate is not an integer, or period
+                is not a number
+            ValueError if capacity or rate is less than 1, or period is
+                not positive
+        """
+        for name, value in (('capacity', capacity), ('rate', rate)):
+            if name == 'rate' and value is None:
+                continue
+            elif not isinstance(value, int):
+                raise TypeError(name + ' must be an integer')
+            elif value < 1:
+                raise ValueError(name + ' must be at least 1')
+        if not isinstance(period, (int, float)):
+            raise TypeError('period must be a number')
+        elif period <= 0:
+            raise ValueError('period must be positive')
+        self._capacity = capacity
+        self._rate = rate
+        self._period = period
+        self._entries = []
+        self._accepted = None
+        if rate is not None:
+            from collections import deque
+            self._accepted = deque()
+        self._dropped = 0
+
+    #-----Public methods-----
+
+    def add(self, message, level=INFO):
+        """Add a message to the ring.
+
+        Arguments:
+            message -- message to display
+
+        Keyword Arguments:
+            level -- severity of the message: INFO, WARNING or ERROR
+                (default INFO)
+        """
+        for entry in self._entries:
+            if entry[0] == message and entry[1] == level:
+                entry[2] += 1
+                return
+        if self._rate is not None:
+            now = time.time()
+            while self._accepted and now - self._accepted[0] >= self._period:
+                self._accepted.popleft()
+            if len(self._accepted) >= self._rate:
+                self._dropped += 1
+                return
+            self._accepted.append(now)
+        if len(self._entries) >= self._capacity:
+            lowest = min(self._entries, key=lambda entry: entry[1])
+            if lowest[1] > level:
+                self._dropped += 1
+                return
+            self._entries.remove(lowest)
+        self._entries.append([message, level, 1])
+
+    def clear(self):
+        """Remove every message from the ring."""
+        self._entries = []
+        self._dropped = 0
+
+    #-----Public properties-----
+
+    @property
+    def capacity(self):
+        """Most messages held at once."""
+        return self._capacity
+
+    @property
+    def dropped(self):
+        """Number of messages dropped since the ring was cleared."""
+        return self._dropped
+
+    @property
+    def levels(self):
+        """A list of the severity of each message in the ring."""
+        return [entry[1] for entry in self._entries]
+
+    #-----Method Wrappers-----
+
+    def __iter__(self):
+        for message, level, count in self._entries:
+            if count == 1:
+                yield message
+            else:
+                yield '{} (x{})'.format(message, count)
+        if self._dropped:
+            yield '({} more messages dropped)'.format(self._dropped)
+
+    def __len__(self):
+        return len(self._entries) + bool(self._dropped)
+
+    def __eq__(self, other):
+        if isinstance(other, (MessageRing, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
 class Browser(object):
     """Runs a program made with shellpages.
 
@@ -25,44 +567,823 @@ class Browser(object):
     objects. The first page Browser displays is initialized from the
     'home' parameter. The browser always display the last page in it's
     'history' attribute. Any page name can be appended to the list.
+
+    In keystroke mode, pages that only accept option keys dispatch as
+    soon as an option key is pressed, without waiting for Enter. Any
+    other key falls back to reading a whole line, and so do pages with
+    their own parse method since they may need arguments.
+
+    While it waits for input, the browser can render the pages the
+    current page is most likely to go to next, so displaying the next
+    page is usually just a matter of printing a cached frame. Pages
+    are ranked by how often the user went to them from the current
+    page, followed by the pages its options link to.
+
+    The browser indexes which pages each page's options link to, so
+    entering 'goto <page>' jumps straight to any page reachable from
+    the current one. The history is filled in as if the user had
+    followed the shortest path there. The current page gets to process
+    the input first, so a page whose parse method accepts 'goto ...'
+    as text still receives it.
+
+    The pages dictionary is copied on write. Adding, removing and
+    reloading pages swap in a new dictionary rather than changing the
+    current one, so a page set can be hot reloaded while the browser
+    runs. Each screen is displayed and processed from one snapshot of
+    the pages without any locking.
     """
-    def __init__(self, pages={}, home=None):
-        self.pages = {}
-        if home is None:
-            self.history = []
-        else:
-            self.history = [home]
+    def __init__(self, pages={}, home=None, keystrokes=False, prerender=0):
+        self.keystrokes = keystrokes
+        self.prerender = prerender
+        # The pages and the history are swapped together as one pair,
+        # so a reload never shows new pages with the old history
+        self._state = (dict(pages), [] if home is None else [home])
+        self._transitions = {}
+        self._gos = {}
+        # The pages, each page's links and the cached shortest path
+        # trees, replaced as one tuple like _state
+        self._index = (None, {}, {})
+        self._lock = allocate_lock()
 
     def main(self):
         while True:
-            page = self.pages[self.history[-1]]
+            pages, name = self._current()
+            page = pages[name]
+            if hasattr(page, 'refresh'):
+                page.refresh()
             self._display(page)
-            data = raw_input('> ')
-            subprocess.call(_CLEAR, shell=True)
+            thread = None
+            if self.prerender:
+                import threading
+                thread = threading.Thread(
+                    target=self._prerender, args=(name, pages))
+                thread.daemon = True
+                thread.start()
+            try:
+                data = self._read(page)
+            finally:
+                if thread is not None:
+                    thread.join()
+            if data.endswith('\r'):
+                # Sent by a telnet-style client over a Supervisor socket
+                data = data[:-1]
+            _clear()
             if data == 'quit':
                 sys.exit()
-            self._process(page, data)
+            elif not self._process(page, data) and data.startswith('goto '):
+                # The page didn't take the input, so it's a goto command
+                # and the page's parse error doesn't apply
+                page.remove_messages()
+                try:
+                    self.goto(data[len('goto '):].strip())
+                except ValueError as e:
+                    page.add_message(e.args[0], ERROR)
+                continue
+            self._record(name)
+
+    def add_page(self, name, page):
+        """Add a page to the browser's pages and index its links.
+
+        Arguments:
+            name -- name of the page
+            page -- page to add
+
+        Side Effects:
+            Replaces the browser's pages with a copy that has the page
+            added or overwritten
+        """
+        with self._lock:
+            pages = dict(self.pages)
+            pages[name] = page
+            self.pages = pages
+            self._reindex(pages, [name])
+
+    def remove_page(self, name):
+        """Remove a page from the browser's pages and its index.
+
+        Arguments:
+            name -- name of the page
+
+        Side Effects:
+            Replaces the browser's pages with a copy without the page
+
+        Raises:
+            ValueError if name isn't a page in the browser
+        """
+        with self._lock:
+            pages = dict(self.pages)
+            try:
+                del pages[name]
+            except KeyError:
+                raise ValueError("'" + str(name) + "' is not a page")
+            self.pages = pages
+            self._reindex(pages, [name])
+
+    def reload(self, pages):
+        """Swap in a whole new set of pages at once.
+
+        Screens already being displayed or processed keep using the old
+        pages. The browser stays on its current page if the new pages
+        still have it, and otherwise goes back to the last page in its
+        history that they do have. The pages and the history are
+        replaced together, and an old option that goes to a page that's
+        gone leaves the browser on the last page that's still there.
+
+        Arguments:
+            pages -- map of page names to pages
+
+        Side Effects:
+            Replaces the browser's pages, and removes the names of
+            pages that no longer exist from the history
+
+        Raises:
+            ValueError if none of the pages in the history are in the
+            new pages
+        """
+        pages = dict(pages)
+        with self._lock:
+            history = [name for name in self.history if name in pages]
+            if self.history and not history:
+                raise ValueError(
+                    'none of the pages in the history are in the new pages')
+            self._state = (pages, history)
+
+    def index(self, name):
+        """Update the navigation index for one page.
+
+        Pages added with add_page or reload are indexed automatically,
+        and so are pages added to or replaced in the pages dictionary
+        directly.
+        Only changes to the options of a page that's already in the
+        browser need a call to index.
+
+        Arguments:
+            name -- name of the page to index again
+        """
+        with self._lock:
+            self._reindex(self.pages, [name])
+
+    def path(self, source, destination):
+        """Find the shortest way from one page to another.
+
+        Arguments:
+            source ------- name of the page to start from
+            destination -- name of the page to go to
+
+        Returns:
+            a list of page names from source to destination, or None if
+            the destination can't be reached
+        """
+        pages, links, trees = self._snapshot()
+        return self._path(source, destination, links, trees)
+
+    def reachable(self, source):
+        """A set of the names of every page reachable from a page.
+
+        Arguments:
+            source -- name of the page to start from
+        """
+        pages, links, trees = self._snapshot()
+        return set(self._tree(source, links, trees))
+
+    def goto(self, name):
+        """Go straight to a page reachable from the current page.
+
+        Arguments:
+            name -- name of the page to go to
+
+        Side Effects:
+            Appends every page on the shortest path to the history
+
+        Raises:
+            ValueError if name isn't a page or can't be reached from
+            the current page
+        """
+        pages, links, trees = self._snapshot()
+        if name not in pages:
+            raise ValueError("'" + str(name) + "' is not a page")
+        path = self._path(self.history[-1], name, links, trees)
+        if path is None:
+            raise ValueError("'" + str(name) + "' can't be reached from "
+                             "this page")
+        self.history.extend(path[1:])
+
+    def link(self, name):
+        """Create an option function that goes to another page.
+
+        The function appends the page name to the browser's history,
+        and the name is kept as the function's 'target' attribute so
+        the browser knows where the option goes. Every call with the
+        same name returns the same function, so options linking to a
+        page can be shared with Option.shared.
+
+        Arguments:
+            name -- name of the page to go to
+        """
+        try:
+            return self._gos[name]
+        except KeyError:
+            pass
+        def go(*args, **kwargs):
+            self.history.append(name)
+        go.target = name
+        self._gos[name] = go
+        return go
+
+    @property
+    def pages(self):
+        """A dictionary of page names to pages."""
+        return self._state[0]
+
+    @pages.setter
+    def pages(self, other):
+        self._state = (other, self._state[1])
+
+    @property
+    def history(self):
+        """A list of the names of the pages visited, the last displayed.
+
+        Any page name can be appended to it to go to that page.
+        """
+        return self._state[1]
+
+    @history.setter
+    def history(self, other):
+        self._state = (self._state[0], other)
 
     def _display(self, page):
-        if re.match(r'^<.+>$', page.__str__()):
+        # Pages that lay themselves out as frames don't need checking
+        frame = getattr(page, 'frame', None)
+        if frame is None and _is_default_str(page.__str__()):
             raise TypeError('Invalid object being displayed')
-        print page
+        print(page if frame is None else frame())
+
+    def memory(self):
+        """Approximate the memory retained by each page and the history.
+
+        Objects shared between pages are only counted for the first
+        page that holds them, and a page held by another page's option
+        is only counted for itself.
+
+        Returns:
+            {'pages': {name: usage}, 'history': bytes} where each usage
+            is a dictionary of bytes used by the page's
+                text ------- title, body and rendered frames
+                options ---- option objects and the key-order list
+                closures --- functions of the options and everything
+                    their closures hold
+                messages --- messages
+                total ------ all of the above and everything else the
+                    page holds
+        """
+        seen = set([id(self), id(self.pages)])
+        seen.update(id(page) for page in self.pages.values())
+        usages = {}
+        for name, page in self.pages.items():
+            attrs = getattr(page, '__dict__', {})
+            options = attrs.get('_options', {})
+            usage = {}
+            usage['text'] = sum(
+                _sizeof(attrs.get(attr), seen) for attr in
+                ('_title', '_body', '_frame', '_rendered_options'))
+            usage['closures'] = sum(
+                _sizeof(getattr(option, '_function', option), seen)
+                for option in options.values())
+            usage['options'] = (_sizeof(options, seen) +
+                                _sizeof(attrs.get('_order'), seen))
+            usage['messages'] = _sizeof(attrs.get('_messages'), seen)
+            usage['total'] = (sum(usage.values()) + sys.getsizeof(page) +
+                              _sizeof(attrs, seen))
+            usages[name] = usage
+        return {'pages': usages, 'history': _sizeof(self.history, seen)}
+
+    def memory_snapshot(self):
+        """Take a snapshot of the memory allocated by the program.
+
+        Pass the snapshot to memory_diff later on to find what was
+        allocated in between. Memory allocations are traced from the
+        first snapshot on.
+
+        Raises:
+            RuntimeError if the tracemalloc module isn't available
+        """
+        tracemalloc = _tracemalloc()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return tracemalloc.take_snapshot()
+
+    def memory_diff(self, snapshot, limit=10):
+        """Compare the memory allocated now to an earlier snapshot.
+
+        Arguments:
+            snapshot -- snapshot taken with memory_snapshot
+
+        Keyword Arguments:
+            limit -- number of source lines to report (default 10)
+
+        Returns:
+            a list of tracemalloc.StatisticDiff objects for the source
+            lines whose allocations grew the most
+
+        Raises:
+            RuntimeError if the tracemalloc module isn't available
+        """
+        tracemalloc = _tracemalloc()
+        ignore = tracemalloc.Filter(False, tracemalloc.__file__)
+        now = tracemalloc.take_snapshot().filter_traces([ignore])
+        snapshot = snapshot.filter_traces([ignore])
+        return now.compare_to(snapshot, 'lineno')[:limit]
+
+    def _path(self, source, destination, links, trees):
+        parents = self._tree(source, links, trees)
+        if destination not in parents:
+            return None
+        path = [destination]
+        while path[-1] != source:
+            path.append(parents[path[-1]])
+        path.reverse()
+        return path
+
+    def _tree(self, source, links, trees):
+        # Breadth first search tree of the shortest paths from a page.
+        # The tree is cached in the trees of the same snapshot as the
+        # links it was built from, so it's dropped along with them.
+        try:
+            return trees[source]
+        except KeyError:
+            pass
+        parents = {source: None} if source in links else {}
+        frontier = list(parents)
+        while frontier:
+            following = []
+            for name in frontier:
+                for target in sorted(links[name][1]):
+                    if target not in parents and target in links:
+                        parents[target] = name
+                        following.append(target)
+            frontier = following
+        trees[source] = parents
+        return parents
+
+    def _snapshot(self):
+        # The current (pages, links, trees) index, first indexing pages
+        # that were changed or swapped in since the last time
+        index = self._index
+        pages = self.pages
+        if index[0] is pages and not self._stale(pages, index[1]):
+            return index
+        with self._lock:
+            pages = self.pages
+            self._reindex(pages, self._stale(pages, self._index[1]))
+            return self._index
+
+    def _stale(self, pages, links):
+        # Names of the pages whose links aren't indexed as they are now
+        stale = [name for name, page in pages.items()
+                 if links.get(name, (None,))[0] is not page]
+        if stale or len(links) != len(pages):
+            stale.extend(name for name in links if name not in pages)
+        return stale
+
+    def _reindex(self, pages, names):
+        # Publish a new index with the named pages indexed again. Must
+        # be called with the lock held.
+        _, links, trees = self._index
+        if names:
+            links = dict(links)
+        changed = False
+        for name in names:
+            old = links.pop(name, (None, None))[1]
+            new = None
+            if name in pages:
+                page = pages[name]
+                new = set(getattr(page, 'targets', {}).values())
+                links[name] = page, new
+            # Shortest paths only change when the page's links do
+            changed = changed or new != old
+        self._index = (pages, links, {} if changed else trees)
+
+    def _current(self):
+        # The pages and the name of the page to display, from one
+        # snapshot. An option made before a reload can still go to a
+        # page that's gone, so fall back to the last page in the
+        # history that's still there.
+        pages, history = self._state
+        while history and history[-1] not in pages:
+            history.pop()
+        if not history:
+            raise ValueError('none of the pages in the history exist')
+        return pages, history[-1]
+
+    def _record(self, name):
+        # Count how often each page is followed by another
+        if self.history and self.history[-1] != name:
+            counts = self._transitions.setdefault(name, {})
+            counts[self.history[-1]] = counts.get(self.history[-1], 0) + 1
+
+    def _candidates(self, name, pages):
+        # Pages most likely to be displayed after the named page
+        counts = self._transitions.get(name, {})
+        ranked = sorted(counts, key=lambda other: -counts[other])
+        targets = getattr(pages[name], 'targets', {})
+        for key in getattr(pages[name], 'order', ()):
+            if key in targets and targets[key] not in ranked:
+                ranked.append(targets[key])
+        return [other for other in ranked
+                if other != name and other in pages]
+
+    def _prerender(self, name, pages):
+        for other in self._candidates(name, pages)[:self.prerender]:
+            pages[other].__str__()
+
+    def _read(self, page):
+        if getattr(page, 'watch', False) and sys.platform != 'win32':
+            return self._watch(page)
+        elif (self.keystrokes and getattr(page, 'keystrokes', False) and
+                sys.stdin.isatty()):
+            return self._read_key(page)
+        return raw_input('> ')
+
+    def _readline(self):
+        # Read a line straight from stdin's file descriptor, one byte at
+        # a time so nothing after the newline is taken. Reading through
+        # sys.stdin would buffer the lines that follow, where select
+        # can't see them and options reading input themselves still can
+        try:
+            fd = sys.stdin.fileno()
+        except (AttributeError, ValueError):
+            # Not a real file, so there's no descriptor to read from
+            data = sys.stdin.readline()
+            if not data:
+                raise EOFError
+            return data.rstrip('\n')
+        data = []
+        while True:
+            byte = os.read(fd, 1)
+            if not byte:
+                if not data:
+                    raise EOFError
+                break
+            elif byte == b'\n':
+                break
+            data.append(byte)
+        line = b''.join(data)
+        if not isinstance(line, str):
+            line = line.decode('utf-8', 'replace')
+        return line
+
+    def _read_key(self, page):
+        sys.stdout.write('> ')
+        sys.stdout.flush()
+        key = _getch()
+        if key == '\x03':
+            raise KeyboardInterrupt
+        elif key == '\x04':
+            raise EOFError
+        elif key in ('\r', '\n'):
+            sys.stdout.write('\n')
+            return ''
+        sys.stdout.write(key)
+        if key in page.order:
+            sys.stdout.write('\n')
+            return key
+        # Not an option, so finish reading the line as usual
+        return key + raw_input()
+
+    def _watch(self, page):
+        # Redraw the page whenever its data changes while waiting for
+        # input
+        import select
+        sys.stdout.write('> ')
+        sys.stdout.flush()
+        # Never poll faster than this, even if watch was turned on for
+        # a page whose data is never fresh
+        timeout = max(page.interval, 0.1)
+        while True:
+            if select.select([sys.stdin], [], [], timeout)[0]:
+                return self._readline()
+            if page.refresh():
+                _clear()
+                self._display(page)
+                sys.stdout.write('> ')
+                sys.stdout.flush()
 
     def _process(self, page, data):
+        # Returns whether the page accepted the input
         try:
             key, args, kwargs = page.process(data)
-            if key != 'invalid input':
-                page.options[key](*args, **kwargs)
+            if key == 'invalid input':
+                return False
+            page.options[key](*args, **kwargs)
+            return True
         except (TypeError, AttributeError) as e:
-            no_process = r".+has no attribute 'process'"
-            no_options = r".+has no attribute 'options'"
-            not_callable = r".+is not callable"
-            errors = filter(
-                lambda r: re.match(r, e.args[0]),
-                [no_process, no_options, not_callable])
-            if errors:
+            import re
+            if re.match(_NOT_A_PAGE_ERRORS, e.args[0]):
                 raise TypeError('Invalid object in the pages dictionary')
 
+class Push(object):
+    """A navigation action that goes to another page.
+
+    Navigation actions are returned by options instead of calling the
+    menu again, so the menu's run method can apply them in a flat loop.
+    """
+
+    def __init__(self, page):
+        """Create a push action.
+
+        Arguments:
+            page -- page to go to
+        """
+        self._page = page
+
+    #-----Public properties-----
+
+    @property
+    def page(self):
+        """The page the action goes to."""
+        return self._page
+
+    #-----Method Wrappers-----
+
+    def __call__(self, menu):
+        menu.push(self._page)
+
+def BACK(menu):
+    """A navigation action that goes to the previous page."""
+    menu.back()
+
+def HOME(menu):
+    """A navigation action that goes to the first page."""
+    menu.home()
+
+def QUIT(menu):
+    """A navigation action that stops the menu."""
+    menu.quit()
+
+class Menu(object):
+    """A stack of pages to display to the user, the last one on top.
+
+    Unlike Browser, a menu doesn't name its pages. Options return a
+    navigation action (Push, BACK, HOME or QUIT) and the run method
+    applies it, so sessions of any length run in constant stack depth.
+    Options that call push, back or home directly and return None
+    still work.
+
+    The stack holds pages, or callables that display a screen
+    themselves and return a navigation action or None.
+    """
+
+    def __init__(self):
+        """Create a menu object."""
+        self._pages = []
+
+    #-----Public methods-----
+
+    def push(self, page):
+        """Push a page onto the page stack.
+
+        Arguments:
+            page -- page, or callable that returns a navigation action
+
+        Raises:
+            TypeError if page is neither a page nor callable
+        """
+        if not (callable(page) or hasattr(page, 'process')):
+            raise TypeError('page must be a page or callable')
+        self._pages.append(page)
+
+    def back(self):
+        """Remove the last page from the page stack."""
+        self._pages = self._pages[:-1]
+
+    def home(self):
+        """Remove every page from the page stack except the first."""
+        self._pages = self._pages[:1]
+
+    def quit(self):
+        """Remove every page from the page stack, which ends run."""
+        self._pages = []
+
+    def run(self):
+        """Display the last page on the stack until there are none left.
+
+        Whatever the page returns is treated as a navigation action and
+        called with the menu, unless it's None.
+        """
+        while self._pages:
+            action = self()
+            if action is not None:
+                action(self)
+
+    #-----Public properties-----
+
+    @property
+    def pages(self):
+        """A copy of the page stack, the displayed page last."""
+        return self._pages[:]
+
+    #-----Private methods-----
+
+    def _show(self, page):
+        # Display the page until the user picks an option, and return
+        # what the option returns
+        while True:
+            if hasattr(page, 'refresh'):
+                page.refresh()
+            _clear()
+            frame = getattr(page, 'frame', None)
+            print(page if frame is None else frame())
+            key, args, kwargs = page.process(raw_input('> '))
+            if key != 'invalid input':
+                return page.options[key](*args, **kwargs)
+
+    #-----Method Wrappers-----
+
+    def __call__(self):
+        page = self._pages[-1]
+        if callable(page):
+            return page()
+        return self._show(page)
+
+class Supervisor(object):
+    """Serve one page graph to many sessions from forked workers.
+
+    The supervisor builds a Browser once, validates its pages, renders
+    them and freezes the garbage collector so the collector doesn't
+    write to the pages' memory. Every connection is then served by a
+    forked worker that inherits the page graph, so the memory holding
+    it stays shared between workers until a worker changes a page.
+    """
+    def __init__(self, build):
+        """Create a supervisor object.
+
+        Arguments:
+            build -- function that returns the Browser to serve
+
+        Raises:
+            TypeError if build is not callable, doesn't return a
+                Browser or the Browser has an invalid page
+            ValueError if the Browser has no valid home page or an
+                option links to a page that doesn't exist
+        """
+        if not callable(build):
+            raise TypeError('build must be callable')
+        self._browser = build()
+        if not isinstance(self._browser, Browser):
+            raise TypeError('build must return a Browser')
+        self._history = self._browser.history[:]
+        self._workers = set()
+        self.validate()
+
+    #-----Public methods-----
+
+    def validate(self):
+        """Check the page graph and render every page.
+
+        Raises:
+            TypeError if a page has no process or options attribute
+            ValueError if the Browser has no valid home page or an
+                option links to a page that doesn't exist
+        """
+        pages = self._browser.pages
+        if not self._history or self._history[-1] not in pages:
+            raise ValueError('home must be a page in the browser')
+        for name, page in pages.items():
+            if not (hasattr(page, 'process') and hasattr(page, 'options')):
+                raise TypeError('Invalid object in the pages dictionary')
+            for key, target in getattr(page, 'targets', {}).items():
+                if target not in pages:
+                    raise ValueError(
+                        "option '{}' on page '{}' links to unknown page "
+                        "'{}'".format(key, name, target))
+            page.__str__()
+
+    def serve(self, address, measure=0):
+        """Fork a worker running the Browser for every connection.
+
+        Each worker reads input from and displays pages to its
+        connection. Serving never returns.
+
+        Arguments:
+            address -- (host, port) pair for a TCP socket, or a path for
+                a unix socket
+
+        Keyword Arguments:
+            measure -- seconds between reports of every worker's shared
+                and private memory on stderr, or 0 to never report
+                (default 0)
+
+        Raises:
+            RuntimeError if the platform can't fork processes
+        """
+        if not hasattr(os, 'fork'):
+            raise RuntimeError('serving needs a platform with os.fork')
+        import socket
+        if isinstance(address, basestring):
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(address)
+        listener.listen(5)
+        if measure:
+            listener.settimeout(measure)
+        self._freeze()
+        try:
+            while True:
+                self._reap()
+                try:
+                    connection = listener.accept()[0]
+                except socket.timeout:
+                    self._measure()
+                    continue
+                connection.setblocking(True)
+                pid = os.fork()
+                if pid == 0:
+                    listener.close()
+                    self._session(connection)
+                connection.close()
+                self._workers.add(pid)
+        finally:
+            listener.close()
+
+    def report(self):
+        """Measure the memory of every worker.
+
+        Returns:
+            a dictionary of worker process ids to (shared, private)
+            pairs of resident memory in kB
+        """
+        report = {}
+        for pid in sorted(self._workers):
+            try:
+                report[pid] = _rss(pid)
+            except (IOError, OSError):
+                pass
+        return report
+
+    #-----Public properties-----
+
+    @property
+    def browser(self):
+        """The Browser every worker runs."""
+        return self._browser
+
+    @property
+    def workers(self):
+        """A set of the process ids of the running workers."""
+        return set(self._workers)
+
+    #-----Private methods-----
+
+    def _freeze(self):
+        # Move everything built so far out of the collector's reach, so
+        # collecting in a worker doesn't copy the page graph's memory
+        gc.collect()
+        if hasattr(gc, 'freeze'):
+            gc.freeze()
+        else:
+            # Without freeze the only way is to never collect, in the
+            # supervisor and in every worker it forks
+            gc.disable()
+
+    def _reap(self):
+        while self._workers:
+            try:
+                pid = os.waitpid(-1, os.WNOHANG)[0]
+            except OSError:
+                pid = 0
+            if not pid:
+                break
+            self._workers.discard(pid)
+
+    def _measure(self):
+        for pid, (shared, private) in self.report().items():
+            sys.stderr.write('worker {}: shared {} kB, private {} kB\n'.format(
+                pid, shared, private))
+
+    def _session(self, connection):
+        # Runs in the worker and never returns
+        import socket
+        status = 0
+        os.dup2(connection.fileno(), 0)
+        os.dup2(connection.fileno(), 1)
+        connection.close()
+        self._browser.history = self._history[:]
+        try:
+            self._browser.main()
+        except (SystemExit, EOFError, KeyboardInterrupt, socket.error):
+            pass
+        except Exception:
+            import traceback
+            traceback.print_exc()
+            status = 1
+        try:
+            sys.stdout.flush()
+        except (IOError, OSError):
+            pass
+        os._exit(status)
+
 class Page(object):
     """Display a page to the user and provide methods for parsing input
 
@@ -80,7 +1401,8 @@ class Page(object):
     arguments meant to call its options with.
     """
     def __init__(self, title='', body='', options={}, order=[],
-            parse=lambda self, data: ('input not checked', () ,{})):
+            parse=_default_parse, layout=None, style='list',
+            messages=None):
         """Create a page object.
 
         Keyword Arguments:
@@ -89,23 +1411,43 @@ class Page(object):
             options -- map of keys to option objects (default {})
             order ---- list of keys for option display order (default [])
             parse ---- function meant to parse user input
-                (default lambda data: (data, (), {})
+                (default lambda self, data: ('input not checked', (), {}))
+            layout --- layout used to fit the page to the terminal. If
+                None, the page is a fixed 80 columns wide and the
+                length of the title and body lines is checked when
+                they're set. (default None)
+            style ---- how options are arranged: 'list', 'grid' or
+                'table' (default 'list')
+            messages - message ring holding the page's messages, or
+                None for a ring of 10 (default None)
 
         Raises:
-            TypeError when options doesn't have an 'iteritems' method
-            or parse is not callable
+            TypeError when options doesn't have an 'items' method,
+            parse is not callable, layout is not a Layout or messages
+            is not a MessageRing
+            ValueError when style is not a valid style
         """
+        if layout is not None and not isinstance(layout, Layout):
+            raise TypeError('layout must be a Layout')
+        if messages is not None and not isinstance(messages, MessageRing):
+            raise TypeError('messages must be a MessageRing')
+        self._strict = layout is None
+        self._layout = layout or _FIXED_LAYOUT
+        self._rendered_options = None
+        self._frame = None
+        self.style = style
+
         self.title = title
         self.body = body
 
         self._options = {}
-        if not hasattr(options, 'iteritems'):
+        if not hasattr(options, 'items'):
             raise TypeError('options must be a dictionary')
-        for key, option in options.iteritems():
+        for key, option in options.items():
             self.add_option(key, option)
         self.order = order
 
-        self._messages = []
+        self._messages = messages if messages is not None else MessageRing()
         if parse is not None:
             self.parse = parse
         else:
@@ -135,17 +1477,55 @@ class Page(object):
                 key is more than 1 character
                 option string is more than 79 characters
         """
-        try:
-            assert isinstance(key, basestring), TypeError(
-                'key must be a string')
-            assert len(key) == 1, ValueError('key must be 1 character')
-            assert callable(option), TypeError(
-                'option must be callable')
-            assert not re.match(r'^<.+>$', option.__str__()), TypeError(
-                'option must have a valid string method wrapper')
-        except AssertionError as e:
-            raise e.args[0]
+        _check_option(key, option)
         self._options[key] = option
+        self._rendered_options = None
+        self._frame = None
+
+    def add_options(self, options, order=False):
+        """Add many options to the page's option dictionary at once.
+
+        Every option is checked before any of them is added, and the
+        page's caches are only cleared once, so adding n options takes
+        linear time.
+
+        Arguments:
+            options -- map of keys to option objects, or a sequence of
+                option objects to add at their own 'key'
+
+        Keyword Arguments:
+            order -- append the keys to the page's key-order list in the
+                order they're given (default False)
+
+        Side Effects:
+            Adds or overwrites an option object at each key in the
+            page's option dictionary.
+
+        Raises:
+            TypeError and ValueError the same as add_option. No options
+            are added if any of them is invalid.
+        """
+        if hasattr(options, 'items'):
+            items = list(options.items())
+        else:
+            items = [(getattr(option, 'key', None), option)
+                     for option in options]
+        for key, option in items:
+            # Options already checked their own key and string
+            if not (isinstance(option, Option) and key == option.key):
+                _check_option(key, option)
+        if order:
+            # The order may be any sequence, like a tuple or a string
+            ordered = set(self._order)
+            new_order = list(self._order)
+            for key, option in items:
+                if key not in ordered:
+                    ordered.add(key)
+                    new_order.append(key)
+            self._order = new_order
+        self._options.update(items)
+        self._rendered_options = None
+        self._frame = None
 
     def remove_option(self, key):
         """Remove an option from the page's option dictionary.
@@ -167,22 +1547,37 @@ class Page(object):
             raise ValueError("'" + str(key) + "' is not an option")
         if key in self.order:
             self._order.remove(key)
+        self._rendered_options = None
+        self._frame = None
 
-    def add_message(self, message):
+    def add_message(self, message, level=INFO):
         """Add a message to display to the user.
 
+        The page's message ring decides whether the message is kept,
+        counted as a repeat or dropped.
+
         Arguments:
             message -- message to display
 
+        Keyword Arguments:
+            level -- severity of the message: INFO, WARNING or ERROR
+                (default INFO)
+
         Raises:
             TypeError if message is not string
+            ValueError if level is not a severity
         """
         if not isinstance(message, basestring):
             raise TypeError('message must be a string')
-        self._messages.append(message)
+        elif level not in (INFO, WARNING, ERROR):
+            raise ValueError('level must be INFO, WARNING or ERROR')
+        self._messages.add(message, level)
+        self._frame = None
 
     def remove_messages(self):
-        self._messages = []
+        if self._messages:
+            self._messages.clear()
+            self._frame = None
 
     def process(self, data):
         """Parse data into a key and arguments to call wtih an option
@@ -201,7 +1596,7 @@ class Page(object):
             self.remove_messages()
             key, args, kwargs = self._parse(data)
             if key == 'input not checked':
-                if data not in self.options.iterkeys():
+                if data not in self._options:
                     raise ParseError(
                         'Invalid input. Please enter an option from ' +
                         str(self.order))
@@ -212,28 +1607,50 @@ class Page(object):
                     '"invalid input"')
             return key, args, kwargs
         except ParseError as e:
-            self.add_message(e.args[0])
+            self.add_message(e.args[0], ERROR)
             return 'invalid input', (), {}
         except (TypeError, ValueError) as e:
-            not_iterable = r"'[\w\.]*\w+' object is not iterable"
-            not_enough = r'need more than [12] values* to unpack'
-            too_many = r'too many values to unpack'
-            for pattern in (not_iterable, not_enough, too_many):
-                if re.match(pattern, e.args[0]):
-                    raise ValueError('parse method must return 3 values')
+            import re
+            if re.match(_UNPACK_ERRORS, e.args[0]):
+                raise ValueError('parse method must return 3 values')
             raise e
 
+    @classmethod
+    def from_options(cls, options, *args, **kwargs):
+        """Create a page that displays options in the order given.
+
+        Arguments:
+            options -- sequence of option objects, or a map of keys to
+                option objects
+
+            All other arguments are passed to the page's constructor.
+
+        Raises:
+            TypeError and ValueError the same as add_option
+        """
+        page = cls(*args, **kwargs)
+        page.add_options(options, order=True)
+        return page
+
     #-----Public properties-----
 
+    @property
+    def layout(self):
+        """The layout the page is fitted to when it's displayed."""
+        return self._layout
+
     @property
     def title(self):
         """The title of the page.
 
+        Pages with a layout truncate their title to fit the terminal
+        instead of limiting its length.
+
         Setting the title Raises:
             TypeError if not a string
             ValueError when
                 longer than 1 line
-                more than 77 characters
+                more than 77 characters on a page without a layout
         """
         return self._title
 
@@ -243,17 +1660,22 @@ class Page(object):
             raise TypeError('Title must be a string')
         elif other.find('\n') != -1:
             raise ValueError('Title must be no longer than 1 line')
-        elif len(other) > 77:
+        elif self._strict and len(other) > 77:
             raise ValueError('Title must be less than 78 characters')
         self._title = other
+        self._frame = None
 
     @property
     def body(self):
         """The body of the page.
 
+        Pages with a layout wrap long lines to fit the terminal instead
+        of limiting their length.
+
         Setting the body raises:
             TypeError if not a string
-            ValueError if any of the lines are more than 77 characters
+            ValueError if any of the lines are more than 79 characters
+                on a page without a layout
         """
         return self._body
 
@@ -261,11 +1683,14 @@ class Page(object):
     def body(self, other):
         if type(other) is not str:
             raise TypeError('Body must be a string'.format(other))
-        for line in other.split('\n'):
-            if len(line) > 79:
-                raise ValueError(
-                    'Each line in the body must be less than 80 characters')
+        if self._strict:
+            for line in other.split('\n'):
+                if len(line) > 79:
+                    raise ValueError(
+                        'Each line in the body must be less than 80 '
+                        'characters')
         self._body = other
+        self._frame = None
 
     @property
     def options(self):
@@ -275,6 +1700,7 @@ class Page(object):
         the dictionary. If you want to modify the dictionary, use the
         add_option and remove_option methods
         """
+        from copy import deepcopy
         return deepcopy(self._options)
 
     @property
@@ -293,12 +1719,45 @@ class Page(object):
 
     @order.setter
     def order(self, other):
-        if not isinstance(other, Sequence):
-            raise TypeError('order must be an ordered container')
+        if not isinstance(other, (list, tuple)):
+            try:
+                from collections.abc import Sequence
+            except ImportError:
+                # Python 2
+                from collections import Sequence
+            if not isinstance(other, Sequence):
+                raise TypeError('order must be an ordered container')
         for key in other:
-            if key not in self.options.iterkeys():
+            if key not in self._options:
                 raise ValueError('each key in order must be a key in options')
         self._order = other
+        self._rendered_options = None
+        self._frame = None
+
+    @property
+    def style(self):
+        """How the page's options are arranged when it's displayed.
+
+        'list' shows one option per line. 'grid' fits as many columns
+        of options as the page is wide, which keeps large menus on one
+        screen. 'table' aligns the tab separated fields of each
+        option's text into columns.
+
+        The arranged options are cached until the options, order,
+        style or width of the page change.
+
+        Setting style Raises:
+            ValueError if not 'list', 'grid' or 'table'
+        """
+        return self._style
+
+    @style.setter
+    def style(self, other):
+        if other not in ('list', 'grid', 'table'):
+            raise ValueError("style must be 'list', 'grid' or 'table'")
+        self._style = other
+        self._rendered_options = None
+        self._frame = None
 
     @property
     def parse(self):
@@ -326,32 +1785,330 @@ class Page(object):
     def parse(self, other):
         if not callable(other):
             raise TypeError('parse must be callable')
+        from types import MethodType
         self._parse = MethodType(other, self)
 
+    @property
+    def targets(self):
+        """A dictionary of option keys to the names of the pages they go to.
+
+        Only options made with Browser.link, or whose function has a
+        'target' attribute, are included.
+        """
+        targets = {}
+        for key, option in self._options.items():
+            target = getattr(option, 'target', None)
+            if target is not None:
+                targets[key] = target
+        return targets
+
+    @property
+    def keystrokes(self):
+        """Whether the page only accepts option keys as input.
+
+        This is True when the page uses the default parse method, and
+        lets a Browser in keystroke mode dispatch on a single keypress.
+        """
+        return self._parse.__func__ is _default_parse
+
+    def frame(self):
+        """Lay the page out for display as a Frame.
+
+        The frame is cached until the page or its width changes, which
+        also lets a Browser lay pages out ahead of time.
+        """
+        width = self._layout.width
+        frame = self._frame
+        if frame is None or frame[0] != width:
+            frame = width, self._render_frame(width)
+            self._frame = frame
+        return frame[1]
+
     #-----Method Wrappers-----
 
     def __str__(self):
-        s = ''
+        return self.frame().__str__()
+
+    #-----Private methods-----
+
+    def _render_frame(self, width):
+        layout = self._layout
+        title, body = '', ()
         if self.title:
-            s += '[{}]\n\n'.format(self.title)
+            title = layout.truncate(self.title, width - 2)
         if self.body:
-            s += self.body + '\n\n'
-        for key in self.order:
-            s += self.options[key].__str__() + '\n'
-        for message in self._messages:
-            s += '\n' + message + '\n'
-        return s
+            body = layout.wrap(self.body, width)
+        rendered = self._rendered_options
+        if rendered is None or rendered[0] != width:
+            rendered = (width,) + self._render_options(width)
+            self._rendered_options = rendered
+        messages = tuple(layout.wrap(message, width)
+                         for message in self._messages)
+        return Frame(title, body, rendered[1], rendered[2], messages)
+
+    def _render_options(self, width):
+        options = tuple(
+            (key, getattr(self._options[key], 'text', None) or
+             self._options[key].__str__()) for key in self._order)
+        rows = [self._options[key].__str__() for key in self._order]
+        if not rows:
+            return options, ()
+        elif self._style == 'grid':
+            return options, tuple(self._layout.grid(rows, width).split('\n'))
+        elif self._style == 'table':
+            return options, tuple(self._layout.table(rows, width).split('\n'))
+        return options, tuple(
+            line for row in rows for line in self._layout.wrap(row, width, 4))
+
+class DynamicPage(Page):
+    """A page whose body shows live data from a data source.
+
+    The data source is only queried again once the last result is
+    older than the page's refresh interval, and the page is only laid
+    out again when the rendered body actually changes. Sources may
+    update and return the same object every time, since the rendered
+    body is what's compared. The Browser refreshes a dynamic page
+    before displaying it, and pages in watch mode are also refreshed
+    while the Browser waits for input.
+    """
+    def __init__(self, source, interval=1.0, render=str, watch=False,
+            title='', options={}, order=[], parse=None, layout=None,
+            style='list', messages=None):
+        """Create a dynamic page object.
 
-def _default_parse(self, data):
-    return 'input not checked', (), {}
+        Arguments:
+            source -- function that returns the page's data
+
+        Keyword Arguments:
+            interval -- seconds before the data is stale (default 1.0)
+            render ---- function that turns data into the page's body
+                (default str)
+            watch ----- refresh the page without waiting for user input
+                (default False)
+
+            All other keyword arguments are the same as Page's.
+
+        Raises:
+            TypeError if source or render is not callable or interval
+                is not a number
+            ValueError if interval is negative, or isn't positive for a
+                page in watch mode
+        """
+        if not callable(source):
+            raise TypeError('source must be callable')
+        if not callable(render):
+            raise TypeError('render must be callable')
+        if not isinstance(interval, (int, float)):
+            raise TypeError('interval must be a number')
+        elif interval < 0:
+            raise ValueError('interval cannot be negative')
+        elif watch and interval == 0:
+            raise ValueError('interval must be positive in watch mode')
+        Page.__init__(
+            self, title, '', options, order, parse, layout, style, messages)
+        self._source = source
+        self._render = render
+        self._interval = interval
+        self._queried = None
+        self._data = None
+        self.watch = watch
+
+    #-----Public methods-----
+
+    def refresh(self, force=False):
+        """Query the data source if the page's data is stale.
+
+        Keyword Arguments:
+            force -- query the data source even if the data isn't stale
+                (default False)
+
+        Returns:
+            True if the data was queried and rendered to a new body
+
+        Raises:
+            TypeError if the render function doesn't return a string
+        """
+        if not (force or self.stale):
+            return False
+        first = self._queried is None
+        data = self._source()
+        self._queried = time.time()
+        self._data = data
+        body = self._render(data)
+        if not first and body == self._body:
+            return False
+        self.body = body
+        return True
+
+    #-----Public properties-----
+
+    @property
+    def data(self):
+        """The last result of the data source."""
+        return self._data
+
+    @property
+    def interval(self):
+        """Seconds before the page's data is stale."""
+        return self._interval
+
+    @property
+    def stale(self):
+        """Whether the data source needs to be queried again."""
+        return (self._queried is None or
+                time.time() - self._queried >= self._interval)
+
+# Separates positional from keyword arguments in a result key. It's
+# never passed to an option, so no positional arguments can look like
+# keyword arguments.
+_KWARGS_MARK = object()
+
+def _result_key(args, kwargs):
+    if not kwargs:
+        return args
+    return args + (_KWARGS_MARK, frozenset(kwargs.items()))
+
+class ResultCache(object):
+    """A bounded store of the results an option's function returned.
+
+    Results are kept per arguments, so calling an option again with
+    the same arguments returns the earlier result without calling its
+    function. When the cache is full the least recently used result
+    makes room, and results older than the time to live are called for
+    again. Calls with arguments that can't be hashed, and calls that
+    raise, are never stored.
+
+    Results are keyed by arguments alone, so a cache belongs to the one
+    option it's given to.
+    """
+    def __init__(self, maxsize=128, ttl=None):
+        """Create a result cache object.
+
+        Keyword Arguments:
+            maxsize -- most results held at once (default 128)
+            ttl ------ seconds a result is kept, or None to keep it
+                until it's evicted or invalidated (default None)
+
+        Raises:
+            TypeError if maxsize is not an integer, or ttl is not a
+                number
+            ValueError if maxsize is less than 1, or ttl is not
+                positive
+        """
+        if not isinstance(maxsize, int):
+            raise TypeError('maxsize must be an integer')
+        elif maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        if ttl is not None:
+            if not isinstance(ttl, (int, float)):
+                raise TypeError('ttl must be a number')
+            elif ttl <= 0:
+                raise ValueError('ttl must be positive')
+        self._maxsize = maxsize
+        self._ttl = ttl
+        from collections import OrderedDict
+        self._results = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        # Whether an option stores its results here
+        self._bound = False
+
+    #-----Public methods-----
+
+    def call(self, function, args=(), kwargs={}):
+        """Call a function, or return its stored result for the args.
+
+        Arguments:
+            function -- function to call
+
+        Keyword Arguments:
+            args ----- positional arguments to call it with (default ())
+            kwargs --- keyword arguments to call it with (default {})
+        """
+        try:
+            key = _result_key(args, kwargs)
+            stored = self._results.pop(key, None)
+        except TypeError:
+            # Unhashable arguments
+            self._misses += 1
+            return function(*args, **kwargs)
+        now = time.time()
+        if stored is not None and (
+                self._ttl is None or now - stored[1] < self._ttl):
+            self._hits += 1
+            self._results[key] = stored
+            return stored[0]
+        self._misses += 1
+        result = function(*args, **kwargs)
+        if len(self._results) >= self._maxsize:
+            self._results.popitem(last=False)
+        self._results[key] = (result, now)
+        return result
+
+    def invalidate(self, *args, **kwargs):
+        """Forget stored results.
+
+        Called without arguments every result is forgotten, otherwise
+        only the result for the arguments given is.
+        """
+        if not args and not kwargs:
+            self._results.clear()
+            return
+        try:
+            key = _result_key(args, kwargs)
+            self._results.pop(key, None)
+        except TypeError:
+            pass
+
+    #-----Public properties-----
+
+    @property
+    def maxsize(self):
+        """Most results held at once."""
+        return self._maxsize
+
+    @property
+    def ttl(self):
+        """Seconds a result is kept, or None if there's no limit."""
+        return self._ttl
+
+    @property
+    def hits(self):
+        """Number of calls answered with a stored result."""
+        return self._hits
+
+    @property
+    def misses(self):
+        """Number of calls that called the function."""
+        return self._misses
+
+    #-----Method Wrappers-----
+
+    def __len__(self):
+        return len(self._results)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
 class Option(object):
     """An option to display to the user and call for its functionality.
 
-    All properties of an option instance are meant to be immutable.
+    All properties of an option instance are meant to be immutable, so
+    an option's row is formatted once and copies of an option are the
+    option itself. Options that many pages show, like 'Back' or 'Quit',
+    can be shared between the pages with Option.shared.
+
+    An option given a ResultCache returns the stored result when it's
+    called again with the same arguments, which suits options that
+    compute expensive reports that rarely change.
     """
+    __slots__ = ('_key', '_text', '_function', '_row', '_cache',
+                 '__weakref__')
 
-    def __init__(self, key, text, function):
+    def __init__(self, key, text, function, cache=None):
         """Create an option object
 
         Arguments:
@@ -359,11 +2116,15 @@ class Option(object):
             text ------ option text
             function -- option functionality
 
+        Keyword Arguments:
+            cache -- ResultCache to store the function's results in, or
+                None to call the function every time (default None)
+
         Raises:
-            TypeError if key and text args are not strings or function
-                is not callable
-            ValueError if length of key is not 1 or length of text is
-                greater than 72
+            TypeError if key and text args are not strings, function
+                is not callable or cache is not a ResultCache
+            ValueError if length of key is not 1, length of text is
+                greater than 72 or cache is used by another option
         """
         # Defensive programming
         try:
@@ -382,6 +2143,12 @@ class Option(object):
             assert callable(function), TypeError(
                 'function must be callable')
 
+            # Check cache arg
+            assert cache is None or isinstance(cache, ResultCache), (
+                TypeError('cache must be a ResultCache'))
+            assert cache is None or not cache._bound, ValueError(
+                'cache is already used by another option')
+
         # Raise appropriate errors
         except AssertionError as e:
             raise e.args[0]
@@ -390,6 +2157,52 @@ class Option(object):
         self._key = key
         self._text = text
         self._function = function
+        self._row = '[{}] {}'.format(key, text)
+        self._cache = cache
+        if cache is not None:
+            cache._bound = True
+
+    #-----Public methods-----
+
+    def invalidate(self, *args, **kwargs):
+        """Forget the option's stored results.
+
+        Called without arguments every result is forgotten, otherwise
+        only the result for the arguments given is. Options without a
+        cache have nothing to forget.
+        """
+        if self._cache is not None:
+            self._cache.invalidate(*args, **kwargs)
+
+    @classmethod
+    def shared(cls, key, text, function):
+        """Get the one option for a key, text and function.
+
+        Every call with equal arguments returns the same option for as
+        long as any page holds it.
+
+        Arguments:
+            key ------- option key-binding
+            text ------ option text
+            function -- option functionality
+
+        Raises:
+            TypeError and ValueError the same as creating an option,
+            and TypeError if function is not hashable
+        """
+        global _SHARED_OPTIONS
+        if _SHARED_OPTIONS is None:
+            import weakref
+            _SHARED_OPTIONS = weakref.WeakValueDictionary()
+        identity = cls, key, text, function
+        try:
+            option = _SHARED_OPTIONS.get(identity)
+        except TypeError:
+            raise TypeError('function must be hashable to be shared')
+        if option is None:
+            option = cls(key, text, function)
+            _SHARED_OPTIONS[identity] = option
+        return option
 
     #-----Public properties-----
 
@@ -413,11 +2226,36 @@ class Option(object):
         """
         return self._text
 
+    @property
+    def target(self):
+        """Name of the page the option goes to, or None if unknown.
+
+        The target is taken from the 'target' attribute of the option's
+        function, which Browser.link sets.
+        """
+        return getattr(self._function, 'target', None)
+
+    @property
+    def cache(self):
+        """ResultCache the option's results are stored in, or None."""
+        return self._cache
+
 
     #-----Method Wrappers-----
 
     def __str__(self):
-        return '[{0.key}] {0.text}'.format(self)
+        return self._row
 
     def __call__(self, *args, **kwargs):
-        return self._function(*args, **kwargs)
+        if self._cache is None:
+            return self._function(*args, **kwargs)
+        return self._cache.call(self._function, args, kwargs)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+# Created by Option.shared, so weakref is only imported when it's used
+_SHARED_OPTIONS = None
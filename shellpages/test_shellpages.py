@@ -1,10 +1,32 @@
 from shellpages import *
+try:
+    from shellpages import shellpages as core
+except ImportError:
+    # Run from inside the package directory
+    import shellpages as core
 
-from copy import deepcopy
-from collections import Sequence
+from copy import copy, deepcopy
 
-from unittest import TestCase
-from test.test_support import run_unittest
+from unittest import (
+    TestCase, TestSuite, TextTestRunner, defaultTestLoader, skipUnless)
+import subprocess
+import tempfile
+import signal
+import socket
+import shutil
+import time
+import sys
+import gc
+import os
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+if not hasattr(TestCase, 'assertRaisesRegex'):
+    # Python 2
+    TestCase.assertRaisesRegex = TestCase.assertRaisesRegexp
 
 class BrowserTest(TestCase):
     def setUp(self):
@@ -15,14 +37,254 @@ class BrowserTest(TestCase):
         self.browser = None
 
     def test_display(self):
-        self.assertRaisesRegexp(
+        self.assertRaisesRegex(
             TypeError, "Invalid object being displayed",
             self.browser._display, lambda: "Invalid")
 
     def test_process(self):
-        self.assertRaisesRegexp(
+        self.assertRaisesRegex(
             TypeError, "Invalid object in the pages dictionary",
-            self.broeser._process, "[1] Option 1", "1")
+            self.browser._process, "[1] Option 1", "1")
+
+    def test_link(self):
+        go = self.browser.link('next')
+        self.assertEqual('next', go.target)
+        self.assertEqual('next', Option('n', 'Next', go).target)
+        go('ignored', argument=True)
+        self.assertEqual(['next'], self.browser.history)
+        self.assertIs(go, self.browser.link('next'))
+        self.assertIsNot(go, Browser().link('next'))
+
+    def test_prerender(self):
+        browser = Browser(home='a', prerender=2)
+        browser.pages = {
+            'a': Page(options={
+                    'b': Option('b', 'Page b', browser.link('b')),
+                    'c': Option('c', 'Page c', browser.link('c')),
+                    'd': Option('d', 'Page d', browser.link('d'))},
+                order=['b', 'c', 'd']),
+            'b': Page('Page b'),
+            'c': Page('Page c'),
+            'd': Page('Page d')}
+        self.assertEqual(
+            ['b', 'c', 'd'], browser._candidates('a', browser.pages))
+
+        for other in ('d', 'c', 'd'):
+            browser.history = ['a', other]
+            browser._record('a')
+        browser.history = ['a']
+        browser._record('a')
+        self.assertEqual({'a': {'c': 1, 'd': 2}}, browser._transitions)
+        self.assertEqual(
+            ['d', 'c', 'b'], browser._candidates('a', browser.pages))
+
+        browser._prerender('a', browser.pages)
+        self.assertEqual(None, browser.pages['b']._frame)
+        self.assertEqual('Page c', browser.pages['c']._frame[1].title)
+        self.assertEqual('Page d', browser.pages['d']._frame[1].title)
+
+    def test_goto(self):
+        browser = Browser(home='a')
+        for name, targets in (('a', 'b'), ('b', 'cd'), ('c', 'e'),
+                              ('d', 'e'), ('e', ''), ('f', 'a')):
+            browser.add_page(name, Page(name, options=dict(
+                (target, Option(target, target, browser.link(target)))
+                for target in targets)))
+        self.assertEqual(['a', 'b', 'c', 'e'], browser.path('a', 'e'))
+        self.assertEqual(None, browser.path('a', 'f'))
+        self.assertEqual(set('abcde'), browser.reachable('a'))
+
+        browser.goto('e')
+        self.assertEqual(['a', 'b', 'c', 'e'], browser.history)
+        self.assertRaisesRegex(
+            ValueError, r"'a' can't be reached from this page",
+            browser.goto, 'a')
+        self.assertRaisesRegex(
+            ValueError, r"'g' is not a page", browser.goto, 'g')
+
+        trees = browser._index[2]
+        browser.add_page('c', Page('c', options={
+            'e': Option('e', 'e', browser.link('e'))}))
+        self.assertTrue(trees is browser._index[2])
+        index = browser._index
+        browser.remove_page('c')
+        self.assertEqual(['a', 'b', 'd', 'e'], browser.path('a', 'e'))
+        # Lookups that started before the removal keep their snapshot
+        self.assertTrue('c' in index[1] and 'c' in index[0])
+        self.assertEqual(['a', 'b', 'c', 'e'],
+                         browser._path('a', 'e', index[1], index[2]))
+        self.assertFalse(index[2] is browser._index[2])
+        browser.pages['e'] = Page('e', options={
+            'f': Option('f', 'f', browser.link('f'))})
+        self.assertEqual(['a', 'b', 'd', 'e', 'f'], browser.path('a', 'f'))
+        del browser.pages['d']
+        self.assertEqual(set('ab'), browser.reachable('a'))
+        self.assertRaisesRegex(
+            ValueError, r"'d' is not a page", browser.remove_page, 'd')
+
+    def test_goto_while_writing(self):
+        import threading
+        browser = Browser(home='a')
+        for name, target in (('a', 'b'), ('b', 'c'), ('c', '')):
+            browser.add_page(name, Page(name, options=dict(
+                (key, Option(key, key, browser.link(key)))
+                for key in target)))
+        done = []
+        def write():
+            while not done:
+                browser.remove_page('b')
+                browser.add_page('b', Page('b', options={
+                    'c': Option('c', 'c', browser.link('c'))}))
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            for i in range(2000):
+                path = browser.path('a', 'c')
+                self.assertTrue(path in (None, ['a', 'b', 'c']), path)
+        finally:
+            done.append(True)
+            writer.join()
+        self.assertEqual(['a', 'b', 'c'], browser.path('a', 'c'))
+
+    def test_goto_command(self):
+        searches = []
+        def parse(self, data):
+            if not data.startswith('goto '):
+                raise ParseError('Search with goto <place>')
+            return 's', (data[len('goto '):],), {}
+        browser = Browser(home='a')
+        browser.add_page('a', Page('A', options={
+            'n': Option('n', 'Search', browser.link('search'))}))
+        browser.add_page('search', Page('Search', options={
+            's': Option('s', 'Search', searches.append)}, parse=parse))
+        inputs = ['goto search', 'goto market']
+        def read(page):
+            if not inputs:
+                raise EOFError
+            return inputs.pop(0)
+        browser._read = read
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            self.assertRaises(EOFError, browser.main)
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(['a', 'search'], browser.history)
+        self.assertEqual(['market'], searches)
+        self.assertEqual([], browser.pages['a']._messages)
+
+    def test_reload(self):
+        browser = Browser({'a': Page('A'), 'b': Page('B')}, home='a')
+        browser.history.append('b')
+        snapshot = browser.pages
+        browser.add_page('c', Page('C'))
+        self.assertEqual(['a', 'b'], sorted(snapshot))
+        self.assertEqual(['a', 'b', 'c'], sorted(browser.pages))
+
+        new = Page('New A')
+        browser.reload({'a': new, 'c': Page('C', options={
+            'a': Option('a', 'Back to a', browser.link('a'))})})
+        self.assertEqual(['a'], browser.history)
+        self.assertTrue(browser.pages['a'] is new)
+        self.assertEqual(['c', 'a'], browser.path('c', 'a'))
+
+        browser.remove_page('c')
+        self.assertEqual(['a'], sorted(browser.pages))
+        self.assertRaisesRegex(
+            ValueError, 'none of the pages in the history are in the new '
+            'pages', browser.reload, {'b': Page('B')})
+        self.assertTrue(browser.pages['a'] is new)
+
+    def test_reload_while_running(self):
+        browser = Browser(home='a')
+        browser.reload({'a': Page('A', options={
+            'x': Option('x', 'Page x', browser.link('x'))}), 'x': Page('X')})
+        state = browser._state
+        displayed = []
+        inputs = ['x']
+        def read(page):
+            displayed.append(page.title)
+            if not inputs:
+                raise EOFError
+            # Reloaded while the operator looks at a page linking to x
+            browser.reload({'a': Page('A2')})
+            return inputs.pop(0)
+        browser._read = read
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            self.assertRaises(EOFError, browser.main)
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(['A', 'A2'], displayed)
+        self.assertEqual(['a'], browser.history)
+        self.assertEqual(['a', 'x'], sorted(state[0]))
+        self.assertEqual(['a'], state[1])
+
+    def test_memory(self):
+        report = list(range(10000))
+        browser = Browser(home='a')
+        browser.add_page('a', Page('A', options={
+            'b': Option('b', 'Page b', browser.link('b')),
+            'r': Option('r', 'Report', lambda: report)}, order=['b', 'r']))
+        browser.add_page('b', Page('B', options={
+            'r': Option('r', 'Report', lambda: report)}))
+        browser.pages['a'].add_message('A message')
+        browser.pages['a'].__str__()
+
+        memory = browser.memory()
+        a, b = memory['pages']['a'], memory['pages']['b']
+        self.assertTrue(a['closures'] > sys.getsizeof(report))
+        self.assertTrue(b['closures'] < sys.getsizeof(report))
+        self.assertTrue(a['text'] > b['text'] > 0)
+        self.assertTrue(a['messages'] > b['messages'])
+        for usage in (a, b):
+            self.assertTrue(usage['total'] > sum(
+                usage[part] for part in
+                ('text', 'options', 'closures', 'messages')))
+        self.assertTrue(memory['history'] > 0)
+
+    def test_memory_deep(self):
+        class Node(object):
+            def __init__(self, child):
+                self.child = child
+        chain = None
+        for i in range(sys.getrecursionlimit() * 2):
+            chain = Node(chain)
+        browser = Browser(home='a')
+        browser.add_page('a', Page('A', options={
+            'c': Option('c', 'Chain', lambda: chain)}))
+        closures = browser.memory()['pages']['a']['closures']
+        self.assertTrue(closures > sys.getrecursionlimit() * 2 *
+                        sys.getsizeof(chain))
+
+    @skipUnless(sys.version_info >= (3, 4), 'needs tracemalloc')
+    def test_memory_diff(self):
+        snapshot = self.browser.memory_snapshot()
+        leak = [str(i) for i in range(10000)]
+        diff = self.browser.memory_diff(snapshot, limit=1)
+        self.assertEqual(1, len(diff))
+        self.assertTrue(diff[0].size_diff > sys.getsizeof(leak))
+        import tracemalloc
+        tracemalloc.stop()
+
+    def test_read_key(self):
+        page = Page(options={
+                '1': Option('1', 'Option 1', lambda: 'This is option 1')},
+            order=['1'])
+        namespace = vars(core)
+        saved = dict((name, namespace[name]) for name in
+                     ('_getch', 'raw_input') if name in namespace)
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            core._getch = lambda: '1'
+            self.assertEqual('1', self.browser._read_key(page))
+            core._getch = lambda: 'q'
+            core.raw_input = lambda: 'uit'
+            self.assertEqual('quit', self.browser._read_key(page))
+            self.assertEqual('> 1\n> q', sys.stdout.getvalue())
+        finally:
+            sys.stdout = stdout
+            namespace.pop('raw_input', None)
+            namespace.update(saved)
 
 class PageTest(TestCase):
     def setUp(self):
@@ -44,12 +306,12 @@ class PageTest(TestCase):
         title = 'Not Test Page'
         self.assertNotEqual(title, page.title)
 
-        with self.assertRaisesRegexp(TypeError, r'Title must be a string'):
+        with self.assertRaisesRegex(TypeError, r'Title must be a string'):
             page.title = 1
-        with self.assertRaisesRegexp(
+        with self.assertRaisesRegex(
                 ValueError, r'Title must be no longer than 1 line'):
             page.title = 'A multi-line\ntitle'
-        with self.assertRaisesRegexp(
+        with self.assertRaisesRegex(
                 ValueError, r'Title must be less than 78 characters'):
             page.title = ('This title is very very very very very very very ' +
                           'very very very very very long')
@@ -65,9 +327,9 @@ class PageTest(TestCase):
         page.body = 'A valid body'
         self.assertEqual('A valid body', page.body)
 
-        with self.assertRaisesRegexp(TypeError, r'Body must be a string'):
+        with self.assertRaisesRegex(TypeError, r'Body must be a string'):
             page.body = 664.3
-        with self.assertRaisesRegexp(
+        with self.assertRaisesRegex(
                 ValueError,
                 r'Each line in the body must be less than 80 characters'):
             page.body = ("A page body with\n" +
@@ -83,26 +345,59 @@ class PageTest(TestCase):
         self.assertTrue('3' in page._options.keys())
         self.assertFalse('3' in page.order)
 
-        self.assertRaisesRegexp(
+        self.assertRaisesRegex(
             TypeError, r'key must be a string', page.add_option,
             4, Option('4', 'Option 4', lambda: 'This is option 4'))
-        self.assertRaisesRegexp(
+        self.assertRaisesRegex(
             ValueError, r'key must be 1 character', page.add_option,
             '[4]', Option('4', 'Option 4', lambda: 'This is option 4'))
-        self.assertRaisesRegexp(
+        self.assertRaisesRegex(
             TypeError, r'option must be callable', page.add_option,
             '4', 'Option 4')
-        self.assertRaisesRegexp(
+        self.assertRaisesRegex(
             TypeError, r'option must have a valid string method wrapper',
             page.add_option, '4', round)
 
+    def test_add_options(self):
+        page = deepcopy(self.page)
+        page.add_options([
+            Option('3', 'Option 3', lambda: 'This is option 3'),
+            Option('1', 'Option 1', lambda: 'This is option 1')], order=True)
+        self.assertEqual(['1', '2', '3'], page.order)
+        page.add_options(
+            {'4': Option('4', 'Option 4', lambda: 'This is option 4')})
+        self.assertTrue('4' in page._options)
+        self.assertEqual(['1', '2', '3'], page.order)
+
+        self.assertRaisesRegex(
+            TypeError, r'key must be a string', page.add_options,
+            [Option('5', 'Option 5', round), round])
+        self.assertRaisesRegex(
+            ValueError, r'key must be 1 character', page.add_options,
+            {'5': Option('5', 'Option 5', round), '66': round})
+        self.assertFalse('5' in page._options)
+
+        for order in (('1',), '1'):
+            page = Page(options={'1': Option('1', 'Option 1', round)},
+                        order=order)
+            page.add_options([Option('2', 'Option 2', round)], order=True)
+            self.assertEqual(['1', '2'], page.order)
+
+    def test_from_options(self):
+        page = Page.from_options(
+            [Option(key, 'Option ' + key, round) for key in '321'],
+            'Title', style='grid')
+        self.assertEqual(['3', '2', '1'], page.order)
+        self.assertEqual('Title', page.title)
+        self.assertEqual('grid', page.style)
+
     def test_remove_option(self):
         page = deepcopy(self.page)
         self.assertTrue('2' in page._order)
         page.remove_option('2')
         self.assertFalse('2' in page._options.keys())
         self.assertFalse('2' in page._order)
-        self.assertRaisesRegexp(
+        self.assertRaisesRegex(
             ValueError, r"'3' is not an option", page.remove_option, '3')
 
     def test_order(self):
@@ -111,11 +406,11 @@ class PageTest(TestCase):
         self.assertEqual(['1', '2'], order)
         order.append('3')
         self.assertNotEqual(order, page.order)
-        with self.assertRaisesRegexp(
+        with self.assertRaisesRegex(
                 ValueError, 'each key in order must be a key in options'):
             page.order = order
 
-        with self.assertRaisesRegexp(
+        with self.assertRaisesRegex(
                 TypeError, 'order must be an ordered container'):
             page.order = {'1', '2'}
 
@@ -126,21 +421,65 @@ class PageTest(TestCase):
         page = deepcopy(self.page)
         page.add_message('This is a test message')
         self.assertEqual(['This is a test message'], page._messages)
-        self.assertRaisesRegexp(
+        self.assertRaisesRegex(
             TypeError, 'message must be a string', page.add_message, True)
         page.remove_messages()
         self.assertEqual([], page._messages)
 
+        page = Page(messages=MessageRing(capacity=2))
+        for i in range(12):
+            page.add_message('Invalid input', ERROR)
+        page.add_message('Background job finished')
+        page.add_message('Another job finished')
+        self.assertEqual('\nInvalid input (x12)\n\nAnother job finished\n',
+                         page.__str__())
+        self.assertRaisesRegex(
+            ValueError, 'level must be INFO, WARNING or ERROR',
+            page.add_message, 'message', 3)
+        self.assertRaisesRegex(
+            TypeError, 'messages must be a MessageRing', Page, messages=[])
+
+    def test_frame(self):
+        page = deepcopy(self.page)
+        frame = page.frame()
+        self.assertEqual('Test Page', frame.title)
+        self.assertEqual(('This is the body of', 'the test page'), frame.body)
+        self.assertEqual((('1', 'Option 1'), ('2', 'Option 2')),
+                         frame.options)
+        self.assertEqual(('[1] Option 1', '[2] Option 2'), frame.rows)
+        self.assertEqual((), frame.messages)
+        self.assertTrue(frame.__str__() is page.__str__())
+        with self.assertRaises(AttributeError):
+            frame.title = 'Another title'
+
+        page.process('1')
+        self.assertTrue(frame is page.frame())
+        page.process('3')
+        self.assertFalse(frame is page.frame())
+        self.assertEqual(
+            (("Invalid input. Please enter an option from ['1', '2']",),),
+            page.frame().messages)
+        page.remove_messages()
+        self.assertEqual(frame.__str__(), page.__str__())
+        page.title = 'Another title'
+        self.assertEqual('Another title', page.frame().title)
+
+    def test_keystrokes(self):
+        page = deepcopy(self.page)
+        self.assertTrue(page.keystrokes)
+        page.parse = lambda self, data: (data[0], (data[1:],), {})
+        self.assertFalse(page.keystrokes)
+
     def test_parse(self):
         page = deepcopy(self.page)
-        with self.assertRaisesRegexp(
+        with self.assertRaisesRegex(
                 AttributeError, 'parse is a set-only attribute'):
             parse = page.parse
 
         def parse(self, data):
             return 'Hello, world!', (), {}
         page.parse = parse
-        with self.assertRaisesRegexp(TypeError, 'parse must be callable'):
+        with self.assertRaisesRegex(TypeError, 'parse must be callable'):
             page.parse = 'Not a valid parse method'
         self.assertEqual(('Hello, world!', (), {}), page._parse('1'))
 
@@ -183,7 +522,7 @@ class PageTest(TestCase):
             ['You chose Option 2', 'Your arguments were: " Hello, world!"'],
             page._messages)
 
-        self.assertRaisesRegexp(
+        self.assertRaisesRegex(
             ValueError,
             r'Parse method must return key as 1 character or "invalid input"',
             page.process, '3')
@@ -194,7 +533,7 @@ class PageTest(TestCase):
             lambda self, data: [data, (), {}, True]]
         for parse in invalid_parsers:
             page.parse = parse
-            self.assertRaisesRegexp(
+            self.assertRaisesRegex(
                 ValueError, 'parse method must return 3 values',
                 page.process, '1')
 
@@ -292,6 +631,441 @@ class PageTest(TestCase):
             '[1] Option 1\n')
         self.assertEqual(expected, page.__str__())
 
+    def test_layout(self):
+        page = Page(
+            title='A title that is far too long to fit on a narrow terminal',
+            body='A body line that is also too long for the terminal',
+            options={'1': Option('1', 'An option with long text', round)},
+            order=['1'], layout=Layout(20))
+        expected = (
+            '[A title that is...]\n' +
+            '\n' +
+            'A body line that is\n' +
+            'also too long for\n' +
+            'the terminal\n' +
+            '\n' +
+            '[1] An option with\n' +
+            '    long text\n')
+        self.assertEqual(expected, page.__str__())
+
+        page.body = 'x' * 100
+        with self.assertRaisesRegex(
+                ValueError, r'Title must be no longer than 1 line'):
+            page.title = 'A multi-line\ntitle'
+        self.assertRaisesRegex(
+            TypeError, r'layout must be a Layout', Page, layout=20)
+
+    def test_style(self):
+        page = Page(
+            options=dict((key, Option(key, 'Option ' + key, round))
+                         for key in '12345'),
+            order=list('12345'), layout=Layout(40), style='grid')
+        expected = (
+            '[1] Option 1  [3] Option 3  [5] Option 5\n' +
+            '[2] Option 2  [4] Option 4\n')
+        self.assertEqual(expected, page.__str__())
+
+        page.remove_option('5')
+        expected = (
+            '[1] Option 1  [3] Option 3\n' +
+            '[2] Option 2  [4] Option 4\n')
+        self.assertEqual(expected, page.__str__())
+
+        page.add_option('t', Option('t', 'Name\tSize', round))
+        page.add_option('u', Option('u', 'Longer name\t2', round))
+        page.order = ['t', 'u']
+        page.style = 'table'
+        expected = (
+            '[t] Name         Size\n' +
+            '[u] Longer name  2\n')
+        self.assertEqual(expected, page.__str__())
+
+        with self.assertRaisesRegex(
+                ValueError, r"style must be 'list', 'grid' or 'table'"):
+            page.style = 'columns'
+
+class DynamicPageTest(TestCase):
+    def setUp(self):
+        self.queries = []
+        self.depth = 3
+        def source():
+            self.queries.append(self.depth)
+            return self.depth
+        self.page = DynamicPage(
+            source, interval=60, render=lambda depth: 'Depth: %d' % depth,
+            title='Queue',
+            options={'r': Option('r', 'Refresh', lambda: None)},
+            order=['r'])
+
+    def tearDown(self):
+        del self.page
+        self.page = None
+
+    def test_refresh(self):
+        page = self.page
+        self.assertTrue(page.stale)
+        self.assertTrue(page.refresh())
+        self.assertEqual('Depth: 3', page.body)
+        self.assertEqual(3, page.data)
+        self.assertFalse(page.stale)
+
+        self.depth = 4
+        self.assertFalse(page.refresh())
+        self.assertEqual([3], self.queries)
+        self.assertTrue(page.refresh(force=True))
+        self.assertEqual('Depth: 4', page.body)
+        self.assertFalse(page.refresh(force=True))
+        self.assertEqual([3, 4, 4], self.queries)
+
+    def test_refresh_in_place(self):
+        queue = {'depth': 1}
+        page = DynamicPage(lambda: queue,
+                           render=lambda data: 'Depth: %d' % data['depth'])
+        self.assertTrue(page.refresh())
+        queue['depth'] = 5
+        self.assertTrue(page.refresh(force=True))
+        self.assertEqual('Depth: 5', page.body)
+        self.assertFalse(page.refresh(force=True))
+
+    def test_str(self):
+        self.page.refresh()
+        expected = (
+            '[Queue]\n' +
+            '\n' +
+            'Depth: 3\n' +
+            '\n' +
+            '[r] Refresh\n')
+        self.assertEqual(expected, self.page.__str__())
+
+    def test_init(self):
+        self.assertRaisesRegex(
+            TypeError, r'source must be callable', DynamicPage, 3)
+        self.assertRaisesRegex(
+            TypeError, r'render must be callable', DynamicPage, round,
+            render='Depth')
+        self.assertRaisesRegex(
+            TypeError, r'interval must be a number', DynamicPage, round,
+            interval='1')
+        self.assertRaisesRegex(
+            ValueError, r'interval cannot be negative', DynamicPage, round,
+            interval=-1)
+        self.assertRaisesRegex(
+            ValueError, r'interval must be positive in watch mode',
+            DynamicPage, round, interval=0, watch=True)
+        DynamicPage(round, interval=0)
+
+    @skipUnless(sys.platform != 'win32', 'needs select on pipes')
+    def test_option_reads_input(self):
+        try:
+            read_line = raw_input
+        except NameError:
+            # Python 3
+            read_line = input
+        heard = []
+        page = Page('Home', options={
+            'a': Option('a', 'Ask', lambda: heard.append(read_line()))})
+        browser = Browser({'home': page}, home='home')
+        read, write = os.pipe()
+        os.write(write, b'a\nhello\nquit\n')
+        os.close(write)
+        stdin, sys.stdin = sys.stdin, os.fdopen(read)
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            self.assertRaises(SystemExit, browser.main)
+        finally:
+            sys.stdin.close()
+            sys.stdin = stdin
+            sys.stdout = stdout
+        self.assertEqual(['hello'], heard)
+
+    @skipUnless(sys.platform != 'win32', 'needs select on pipes')
+    def test_watch_lines_together(self):
+        self.page.watch = True
+        browser = Browser()
+        read, write = os.pipe()
+        os.write(write, b'r\nsecond line\nthird line\n')
+        stdin, sys.stdin = sys.stdin, os.fdopen(read)
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            self.assertEqual('r', browser._read(self.page))
+            self.assertEqual('second line', browser._read(self.page))
+            self.assertEqual('third line', browser._read(Page()))
+            os.close(write)
+            self.assertRaises(EOFError, browser._read, self.page)
+        finally:
+            sys.stdin.close()
+            sys.stdin = stdin
+            sys.stdout = stdout
+
+class MessageRingTest(TestCase):
+    def setUp(self):
+        self.ring = MessageRing(capacity=3)
+
+    def tearDown(self):
+        del self.ring
+        self.ring = None
+
+    def test_add(self):
+        ring = self.ring
+        for message in ('one', 'two', 'one', 'one'):
+            ring.add(message)
+        self.assertEqual(['one (x3)', 'two'], list(ring))
+        ring.add('two', ERROR)
+        self.assertEqual(['one (x3)', 'two', 'two'], ring)
+        self.assertEqual([INFO, INFO, ERROR], ring.levels)
+
+        ring.add('three', WARNING)
+        self.assertEqual(['two', 'two', 'three'], ring)
+        ring.add('four')
+        self.assertEqual(['two', 'three', 'four'], ring)
+        ring.add('five', ERROR)
+        ring.add('six')
+        self.assertEqual(['two', 'three', 'five', '(1 more messages dropped)'],
+                         ring)
+        self.assertEqual(1, ring.dropped)
+        self.assertEqual(4, len(ring))
+
+        ring.clear()
+        self.assertEqual([], ring)
+        self.assertEqual(0, ring.dropped)
+
+    def test_rate(self):
+        ring = MessageRing(rate=2, period=60)
+        for message in ('one', 'two', 'one', 'three', 'four'):
+            ring.add(message)
+        self.assertEqual(['one (x2)', 'two', '(2 more messages dropped)'],
+                         ring)
+
+    def test_init(self):
+        self.assertRaisesRegex(
+            TypeError, r'capacity must be an integer', MessageRing, 1.5)
+        self.assertRaisesRegex(
+            ValueError, r'rate must be at least 1', MessageRing, rate=0)
+        self.assertRaisesRegex(
+            TypeError, r'period must be a number', MessageRing, period='1')
+        self.assertRaisesRegex(
+            ValueError, r'period must be positive', MessageRing, period=0)
+
+class SupervisorTest(TestCase):
+    def setUp(self):
+        def build():
+            browser = Browser(home='home')
+            browser.pages = {
+                'home': Page('Home', options={
+                    'n': Option('n', 'Next', browser.link('next'))},
+                    order=['n']),
+                'next': Page('Next')}
+            return browser
+        self.build = build
+        self.supervisor = Supervisor(build)
+
+    def tearDown(self):
+        del self.supervisor
+        self.supervisor = None
+
+    def test_validate(self):
+        supervisor = self.supervisor
+        self.assertEqual(
+            'Next', supervisor.browser.pages['next']._frame[1].title)
+        self.assertEqual(set(), supervisor.workers)
+
+        del supervisor.browser.pages['next']
+        self.assertRaisesRegex(
+            ValueError, r"option 'n' on page 'home' links to unknown page "
+            r"'next'", supervisor.validate)
+        supervisor.browser.pages['next'] = 'Next'
+        self.assertRaisesRegex(
+            TypeError, r'Invalid object in the pages dictionary',
+            supervisor.validate)
+
+        self.assertRaisesRegex(
+            TypeError, r'build must be callable', Supervisor, Browser())
+        self.assertRaisesRegex(
+            TypeError, r'build must return a Browser', Supervisor, dict)
+        self.assertRaisesRegex(
+            ValueError, r'home must be a page in the browser', Supervisor,
+            Browser)
+
+    @skipUnless(os.path.exists('/proc/self/smaps'), 'needs /proc')
+    def test_report(self):
+        shared, private = core._rss(os.getpid())
+        self.assertTrue(shared + private > 0)
+        self.assertEqual({}, self.supervisor.report())
+
+    @skipUnless(hasattr(os, 'fork') and hasattr(socket, 'AF_UNIX'),
+                'needs os.fork and unix sockets')
+    def test_serve(self):
+        def build():
+            browser = Browser(home='home')
+            def collector():
+                if getattr(gc, 'get_freeze_count', lambda: 0)():
+                    state = 'frozen'
+                else:
+                    state = 'on' if gc.isenabled() else 'off'
+                browser.pages['home'].add_message('collector ' + state)
+            browser.pages = {
+                'home': Page('Home', options={
+                    'g': Option('g', 'Collector', collector),
+                    'n': Option('n', 'Next', browser.link('next'))},
+                    order=['g', 'n']),
+                'next': Page('Next')}
+            return browser
+        directory = tempfile.mkdtemp()
+        address = os.path.join(directory, 'socket')
+        enabled = gc.isenabled()
+        pid = os.fork()
+        if pid == 0:
+            # The supervisor runs in its own process, since serving
+            # never returns
+            try:
+                sys.stdin, sys.stdout = sys.__stdin__, sys.__stdout__
+                Supervisor(build).serve(address)
+            finally:
+                os._exit(1)
+        try:
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.settimeout(10)
+            for attempt in range(100):
+                try:
+                    client.connect(address)
+                    break
+                except socket.error:
+                    time.sleep(0.05)
+            client.sendall(b'g\r\nn\r\nquit\r\n')
+            output = []
+            while True:
+                data = client.recv(4096)
+                if not data:
+                    break
+                output.append(data)
+            client.close()
+        finally:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            shutil.rmtree(directory)
+        output = b''.join(output).decode()
+        expected = 'frozen' if hasattr(gc, 'freeze') else 'off'
+        self.assertTrue('collector ' + expected in output, output)
+        self.assertTrue('[Next]' in output, output)
+        self.assertFalse('Invalid input' in output, output)
+        self.assertEqual(enabled, gc.isenabled())
+
+class ProfileTest(TestCase):
+    app = '\n'.join([
+        'from shellpages import *',
+        'def build():',
+        '    browser = Browser(home="home")',
+        '    browser.add_page("home", Page("Home", options={',
+        '        "r": Option("r", "Report", lambda: sum(range(1000))),',
+        '        "n": Option("n", "Next", browser.link("next"))}))',
+        '    browser.add_page("next", Page("Next"))',
+        '    return browser'])
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'app.py'), 'w') as app:
+            app.write(self.app)
+        with open(os.path.join(self.directory, 'input.txt'), 'w') as lines:
+            lines.write('r\nx\nn\nquit\nr\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def profile(self, *args):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        environment = dict(os.environ, PYTHONPATH=root)
+        return subprocess.check_output(
+            (sys.executable, '-m', 'shellpages.profile', 'app:build',
+             '-i', 'input.txt') + args,
+            cwd=self.directory, env=environment).decode()
+
+    def test_cprofile(self):
+        report = self.profile('-n', '1')
+        self.assertTrue("page 'home', option 'r': " in report)
+        self.assertTrue("over 3 calls" in report)
+        self.assertTrue("page 'home', process: " in report)
+        self.assertTrue("page 'home', option 'n': " in report)
+        self.assertFalse("page 'next'" in report)
+
+    @skipUnless(hasattr(__import__('signal'), 'SIGPROF'), 'needs SIGPROF')
+    def test_sampling(self):
+        report = self.profile('--sampling')
+        self.assertTrue("page 'home', option 'r': " in report)
+
+class LayoutTest(TestCase):
+    def setUp(self):
+        self.layout = Layout(20)
+
+    def tearDown(self):
+        del self.layout
+        self.layout = None
+
+    def test_width(self):
+        self.assertEqual(20, self.layout.width)
+        self.assertRaisesRegex(
+            TypeError, r'width must be an integer', Layout, '20')
+        self.assertRaisesRegex(
+            ValueError, r'width must be at least 10 characters', Layout, 9)
+
+    def test_fill(self):
+        text = 'short line\n\nthis line is longer than twenty'
+        expected = 'short line\n\nthis line is longer\nthan twenty'
+        self.assertEqual(expected, self.layout.fill(text))
+        self.assertEqual(
+            'this line\n  is longer\n  than\n  twenty',
+            self.layout.fill(text.split('\n')[-1], 11, 2))
+        self.assertTrue(
+            self.layout.wrap(text) is self.layout._cache[(text, 20, 0)])
+        self.assertEqual(
+            ('short line', '', 'this line is longer', 'than twenty'),
+            self.layout.wrap(text))
+
+    def test_cache_bounded(self):
+        self.layout.CACHE_SIZE = 4
+        kept = self.layout.wrap('kept')
+        for i in range(20):
+            self.layout.wrap('line {}'.format(i))
+            self.assertIs(kept, self.layout.wrap('kept'))
+        self.assertLessEqual(
+            len(self.layout._cache) + len(self.layout._old), 8)
+
+        count = [0]
+        def source():
+            count[0] += 1
+            return count[0]
+        page = DynamicPage(source)
+        for i in range(3 * Layout.CACHE_SIZE):
+            page.refresh(force=True)
+            page.__str__()
+        self.assertLessEqual(
+            len(core._FIXED_LAYOUT._cache), Layout.CACHE_SIZE)
+
+    def test_grid(self):
+        cells = ['a', 'bb', 'ccc', 'dddd', 'eeeee']
+        self.assertEqual(
+            'a      ccc    eeeee\nbb     dddd', self.layout.grid(cells))
+        self.assertEqual(
+            'a\nbb\nccc\ndddd\neeeee', self.layout.grid(cells, 10))
+        self.assertEqual('', self.layout.grid([]))
+        self.assertEqual(
+            'this line is long...',
+            self.layout.grid(['this line is longer than twenty']))
+
+    def test_table(self):
+        rows = ['Name\tSize', 'Longer name\t2', 'Single']
+        self.assertEqual(
+            'Name         Size\nLonger name  2\nSingle',
+            self.layout.table(rows))
+        self.assertEqual(
+            'Name...\nLong...\nSingle', self.layout.table(rows, 7))
+
+    def test_truncate(self):
+        self.assertEqual('short line', self.layout.truncate('short line'))
+        self.assertEqual(
+            'this line is long...',
+            self.layout.truncate('this line is longer than twenty'))
+        self.assertEqual('this...', self.layout.truncate('this line', 7))
+
 class OptionTest(TestCase):
     def setUp(self):
         self.option = Option('1', 'Test', lambda: 'This is a test.')
@@ -305,9 +1079,9 @@ class OptionTest(TestCase):
         with self.assertRaises(AttributeError):
             self.option.key = '0'
 
-        with self.assertRaisesRegexp(TypeError, r'key must be a string'):
+        with self.assertRaisesRegex(TypeError, r'key must be a string'):
             option = Option(True, 'Test', lambda: 'This is a test.')
-        with self.assertRaisesRegexp(
+        with self.assertRaisesRegex(
                 ValueError, r'key must be 1 character'):
             option = Option('12', 'Test', lambda: 'This is a test.')
 
@@ -316,9 +1090,9 @@ class OptionTest(TestCase):
         with self.assertRaises(AttributeError):
             self.option.text = 'Attribute Error'
 
-        with self.assertRaisesRegexp(TypeError, r'text must be a string'):
+        with self.assertRaisesRegex(TypeError, r'text must be a string'):
             option = Option('1', 44.44, lambda: 'This is a test.')
-        with self.assertRaisesRegexp(
+        with self.assertRaisesRegex(
                 ValueError, r'text cannot be more than 72 characters'):
             option = Option(
                 '1', ('This is a very very very very very very very very ' +
@@ -327,15 +1101,213 @@ class OptionTest(TestCase):
 
     def test_functionality(self):
         self.assertEqual(self.option(), 'This is a test.')
-        with self.assertRaisesRegexp(TypeError, r'function must be callable'):
+        with self.assertRaisesRegex(TypeError, r'function must be callable'):
             option = Option('1', 'Test', 'This is a test.')
 
     def test_str(self):
         self.assertEqual(self.option.__str__(), '[1] Test')
+        self.assertIs(self.option.__str__(), self.option.__str__())
+
+    def test_copy(self):
+        self.assertIs(copy(self.option), self.option)
+        self.assertIs(deepcopy(self.option), self.option)
+        page = Page(options={'1': self.option})
+        self.assertIs(page.options['1'], self.option)
+
+    def test_shared(self):
+        def back():
+            pass
+        option = Option.shared('b', 'Back', back)
+        self.assertIs(Option.shared('b', 'Back', back), option)
+        self.assertIsNot(Option.shared('b', 'Go back', back), option)
+        self.assertIsNot(Option('b', 'Back', back), option)
+        with self.assertRaisesRegex(ValueError, r'key must be 1 character'):
+            Option.shared('bb', 'Back', back)
+        class Unhashable(object):
+            __hash__ = None
+            def __call__(self):
+                pass
+        with self.assertRaisesRegex(TypeError, r'must be hashable'):
+            Option.shared('b', 'Back', Unhashable())
+
+    def test_cache(self):
+        self.assertIsNone(self.option.cache)
+        self.option.invalidate()
+        calls = []
+        def report(*args, **kwargs):
+            calls.append((args, kwargs))
+            return len(calls)
+        option = Option('r', 'Report', report, cache=ResultCache())
+        self.assertEqual(1, option())
+        self.assertEqual(1, option())
+        self.assertEqual(2, option('a', b=1))
+        self.assertEqual(2, option('a', b=1))
+        self.assertEqual(2, option.cache.hits)
+        self.assertEqual(2, option.cache.misses)
+        option.invalidate('a', b=1)
+        self.assertEqual(3, option('a', b=1))
+        self.assertEqual(1, option())
+        option.invalidate()
+        self.assertEqual(4, option())
+        self.assertIs(deepcopy(option).cache, option.cache)
+
+        with self.assertRaisesRegex(
+                TypeError, r'cache must be a ResultCache'):
+            Option('r', 'Report', report, cache={})
+
+    def test_cache_owner(self):
+        cache = ResultCache()
+        first = Option('a', 'First', lambda: 'first', cache=cache)
+        with self.assertRaisesRegex(
+                ValueError, r'cache is already used by another option'):
+            Option('b', 'Second', lambda: 'second', cache=cache)
+        self.assertEqual('first', first())
+        second = Option('b', 'Second', lambda: 'second',
+                        cache=ResultCache())
+        self.assertEqual('second', second())
+        self.assertEqual('first', first())
+
+class ResultCacheTest(TestCase):
+    def setUp(self):
+        self.calls = 0
+        self.cache = ResultCache(maxsize=2)
+
+    def tearDown(self):
+        del self.cache
+        self.cache = None
+
+    def count(self, *args, **kwargs):
+        self.calls += 1
+        return self.calls
+
+    def test_call(self):
+        self.assertEqual(1, self.cache.call(self.count, ('a',)))
+        self.assertEqual(1, self.cache.call(self.count, ('a',)))
+        self.assertEqual(2, self.cache.call(self.count, ('a',), {'b': 1}))
+        self.assertEqual(2, self.cache.call(self.count, ('a',), {'b': 1}))
+        self.assertEqual((2, 2), (self.cache.hits, self.cache.misses))
+        self.assertEqual(2, len(self.cache))
+
+        nested = (('a',), frozenset([('b', 1)]))
+        self.assertEqual(3, self.cache.call(self.count, nested))
+
+    def test_unhashable(self):
+        self.assertEqual(1, self.cache.call(self.count, ([],)))
+        self.assertEqual(2, self.cache.call(self.count, ([],)))
+        self.assertEqual(0, len(self.cache))
+        self.cache.invalidate([])
+
+    def test_errors_not_stored(self):
+        def fail():
+            raise RuntimeError('failed')
+        with self.assertRaisesRegex(RuntimeError, r'failed'):
+            self.cache.call(fail)
+        self.assertEqual(0, len(self.cache))
+
+    def test_lru(self):
+        self.cache.call(self.count, ('a',))
+        self.cache.call(self.count, ('b',))
+        self.cache.call(self.count, ('a',))
+        self.cache.call(self.count, ('c',))
+        self.assertEqual(1, self.cache.call(self.count, ('a',)))
+        self.assertEqual(4, self.cache.call(self.count, ('b',)))
+
+    def test_ttl(self):
+        now = [100.0]
+        cache = ResultCache(ttl=10)
+        clock, core.time.time = core.time.time, lambda: now[0]
+        try:
+            self.assertEqual(1, cache.call(self.count))
+            now[0] += 9
+            self.assertEqual(1, cache.call(self.count))
+            now[0] += 1
+            self.assertEqual(2, cache.call(self.count))
+        finally:
+            core.time.time = clock
+
+    def test_arguments(self):
+        self.assertEqual(128, ResultCache().maxsize)
+        self.assertIsNone(ResultCache().ttl)
+        with self.assertRaisesRegex(TypeError, r'maxsize must be an integer'):
+            ResultCache(maxsize=1.5)
+        with self.assertRaisesRegex(ValueError, r'maxsize must be at least'):
+            ResultCache(maxsize=0)
+        with self.assertRaisesRegex(TypeError, r'ttl must be a number'):
+            ResultCache(ttl='1')
+        with self.assertRaisesRegex(ValueError, r'ttl must be positive'):
+            ResultCache(ttl=0)
+
+class MenuTest(TestCase):
+    def setUp(self):
+        self.menu = Menu()
+
+    def tearDown(self):
+        del self.menu
+        self.menu = None
+
+    def test_navigation(self):
+        first, second = lambda: None, lambda: None
+        self.menu.push(first)
+        Push(second)(self.menu)
+        Push(second)(self.menu)
+        self.assertEqual([first, second, second], self.menu.pages)
+        BACK(self.menu)
+        self.assertEqual([first, second], self.menu.pages)
+        HOME(self.menu)
+        self.assertEqual([first], self.menu.pages)
+        QUIT(self.menu)
+        self.assertEqual([], self.menu.pages)
+        self.assertRaisesRegex(
+            TypeError, r'page must be a page or callable', self.menu.push,
+            'page')
+
+    def test_run(self):
+        # A long session of actions never grows the call stack
+        screens = []
+        def screen():
+            screens.append(len(self.menu.pages))
+            if len(screens) == 5000:
+                return QUIT
+            return BACK if len(self.menu.pages) > 1 else Push(screen)
+        self.menu.push(screen)
+        self.menu.run()
+        self.assertEqual(5000, len(screens))
+        self.assertEqual([1, 2, 1, 2], screens[:4])
+        self.assertEqual([], self.menu.pages)
+
+    def test_run_pages(self):
+        second = Page('Second', options={
+            'h': Option('h', 'Home', lambda: HOME)})
+        first = Page('First', options={
+            'n': Option('n', 'Next', lambda: Push(second)),
+            'q': Option('q', 'Quit', lambda: QUIT)}, order=['n', 'q'])
+        inputs = ['n', 'x', 'h', 'q']
+        namespace = vars(core)
+        saved = dict((name, namespace[name]) for name in
+                     ('raw_input',) if name in namespace)
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            core.raw_input = lambda prompt: inputs.pop(0)
+            self.menu.push(first)
+            self.menu.run()
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+            namespace.pop('raw_input', None)
+            namespace.update(saved)
+        self.assertEqual([], inputs)
+        self.assertEqual([], self.menu.pages)
+        self.assertEqual(2, output.count('[Second]'))
+        self.assertTrue('Invalid input' in output)
 
 def main():
-    run_unittest(OptionTest)
-    run_unittest(PageTest)
+    cases = (BrowserTest, OptionTest, PageTest, DynamicPageTest,
+             MessageRingTest, SupervisorTest, ProfileTest, LayoutTest,
+             ResultCacheTest, MenuTest)
+    suite = TestSuite(
+        defaultTestLoader.loadTestsFromTestCase(case) for case in cases)
+    result = TextTestRunner(verbosity=2).run(suite)
+    sys.exit(not result.wasSuccessful())
 
 if __name__ == '__main__':
     main()